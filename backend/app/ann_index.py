@@ -0,0 +1,109 @@
+"""FAISS index construction and search-time tuning.
+
+Index type and knobs come from the environment so the same build (``app.ingest``)
+and load (``vector_store.load_index``) paths serve every option:
+
+    FAISS_INDEX_TYPE   flat | ivf_flat | hnsw | ivf_pq   (default flat)
+    FAISS_NLIST        IVF coarse clusters               (default 1024)
+    FAISS_NPROBE       IVF clusters scanned per query    (default 16)
+    FAISS_HNSW_M       HNSW graph degree                 (default 32)
+    FAISS_EF_SEARCH    HNSW search beam width            (default 64)
+    FAISS_PQ_M         PQ sub-quantizers (code bytes)    (default 48)
+    FAISS_PQ_NBITS     bits per PQ sub-code              (default 8)
+"""
+import os
+import logging
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+
+INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat").lower()
+NLIST = int(os.getenv("FAISS_NLIST", "1024"))
+NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+PQ_M = int(os.getenv("FAISS_PQ_M", "48"))
+PQ_NBITS = int(os.getenv("FAISS_PQ_NBITS", "8"))
+
+# faiss wants roughly this many training points per IVF centroid
+_MIN_POINTS_PER_CENTROID = 39
+
+if INDEX_TYPE not in INDEX_TYPES:
+    raise ValueError(f"FAISS_INDEX_TYPE must be one of {INDEX_TYPES}, got {INDEX_TYPE!r}")
+
+
+def factory_string(index_type: str, n_vectors: int, dim: int,
+                   nlist: int = NLIST, hnsw_m: int = HNSW_M,
+                   pq_m: int = PQ_M, pq_nbits: int = PQ_NBITS) -> str:
+    """faiss.index_factory spec for index_type, degraded to Flat when the corpus is too
+    small to train it."""
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "hnsw":
+        return f"HNSW{hnsw_m},Flat"
+
+    nlist = min(nlist, n_vectors // _MIN_POINTS_PER_CENTROID)
+    if nlist < 1:
+        logger.warning("%d vectors is too few to train %s, using Flat", n_vectors, index_type)
+        return "Flat"
+    if index_type == "ivf_flat":
+        return f"IVF{nlist},Flat"
+
+    if dim % pq_m or n_vectors < 2 ** pq_nbits:
+        logger.warning("Cannot train PQ%dx%d on %d vectors of dim %d, using IVF-Flat",
+                       pq_m, pq_nbits, n_vectors, dim)
+        return f"IVF{nlist},Flat"
+    return f"IVF{nlist},PQ{pq_m}x{pq_nbits}"
+
+
+def build_index(vectors, index_type: str = INDEX_TYPE, **knobs) -> faiss.Index:
+    """Build and train an L2 index over vectors (row order becomes the faiss ids)."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    spec = factory_string(index_type, n, dim, **knobs)
+
+    index = faiss.index_factory(dim, spec, faiss.METRIC_L2)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    tune_index(index)
+    logger.info("Built %s index over %d vectors", spec, n)
+    return index
+
+
+def tune_index(index: faiss.Index, nprobe: int = NPROBE, ef_search: int = EF_SEARCH):
+    """Apply search-time knobs; parameters the index doesn't have are skipped."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and not ivf.direct_map.type:
+        # MMR reconstructs candidate vectors by id, which IVF only supports with a direct map
+        ivf.make_direct_map()
+
+    params = faiss.ParameterSpace()
+    for name, value in (("nprobe", nprobe), ("efSearch", ef_search)):
+        try:
+            params.set_index_parameter(index, name, value)
+        except RuntimeError:
+            pass
+
+
+def supports_removal(index: faiss.Index) -> bool:
+    """Whether remove_ids compacts ids the way LangChain's FAISS.delete expects.
+
+    Only flat indexes shift later ids down; IVF keeps labels and HNSW can't remove at all.
+    """
+    return isinstance(index, faiss.IndexFlat)
+
+
+def describe(index: faiss.Index) -> str:
+    if isinstance(index, faiss.IndexFlat):
+        return "flat"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return "ivf_pq" if isinstance(ivf, faiss.IndexIVFPQ) else "ivf_flat"
+    return type(index).__name__
\ No newline at end of file
@@ -0,0 +1,131 @@
+import os
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .embedding_service import normalise_query
+from .vector_store import _get_embeddings, get_index_manager
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+SIMILARITY_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_SIZE", "1024"))
+
+# follow-ups like "what about its side effects?" only make sense with the history,
+# so they must not be answered from (or stored into) the cache
+_FOLLOW_UP_PATTERN = re.compile(
+    r"\b(it|its|it's|this|that|these|those|they|them|their|he|she|his|her|"
+    r"above|previous|earlier|more|else|also|again)\b",
+    re.IGNORECASE,
+)
+
+
+def _depends_on_history(query: str, history: str) -> bool:
+    if not history:
+        return False
+    return bool(_FOLLOW_UP_PATTERN.search(query)) or len(query.split()) <= 3
+
+
+class SemanticCache:
+    """LRU + TTL cache of answers keyed by normalised query embeddings.
+
+    Shared across users, so it only ever holds answers generated without chat history.
+    """
+
+    def __init__(self, threshold: float, ttl: float, max_entries: int):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self._entries = OrderedDict()  # key -> (vector, answer, created_at)
+        self._version = None
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    def _check_version(self):
+        # the index being served, not the file on disk: the mtime moves before the swap,
+        # and answers the old index produced in between would outlive it
+        version = get_index_manager().version
+        if version != self._version:
+            if self._entries:
+                logger.info("Vector index changed, dropping %d cached answers", len(self._entries))
+            self._entries.clear()
+            self._version = version
+
+    def _evict_expired(self, now: float):
+        expired = [k for k, (_, _, created) in self._entries.items() if now - created > self.ttl]
+        for k in expired:
+            del self._entries[k]
+
+    def lookup(self, query: str, history: str = ""):
+        """Return (answer, vector). answer is None on miss; vector is None on bypass."""
+        if _depends_on_history(query, history):
+            with self._lock:
+                self.bypasses += 1
+            return None, None
+
+        vector = np.asarray(_get_embeddings().embed_query(normalise_query(query)), dtype=np.float32)
+
+        with self._lock:
+            self._check_version()
+            self._evict_expired(time.monotonic())
+
+            if self._entries:
+                keys = list(self._entries)
+                matrix = np.stack([self._entries[k][0] for k in keys])
+                # embeddings are L2-normalised, so the dot product is the cosine
+                scores = matrix @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    key = keys[best]
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][1], vector
+
+            self.misses += 1
+            return None, vector
+
+    def store(self, vector, answer: str, history: str = ""):
+        # the cache is shared by all users: an answer written with someone's history or
+        # summary in the prompt may repeat their conditions, so only history-free ones are kept
+        if vector is None or not answer or history:
+            return
+        with self._lock:
+            self._entries[self._next_key] = (vector, answer, time.monotonic())
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": CACHE_ENABLED,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypasses": self.bypasses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_cache = None
+
+
+def get_answer_cache() -> SemanticCache:
+    global _cache
+    if _cache is None:
+        _cache = SemanticCache(SIMILARITY_THRESHOLD, TTL_SECONDS, MAX_ENTRIES)
+    return _cache
\ No newline at end of file
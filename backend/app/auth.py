@@ -1,10 +1,16 @@
 import os
 import uuid
-import bcrypt
+import asyncio
+import logging
 from datetime import datetime, timedelta, timezone
 from fastapi import HTTPException
 from jose import jwt, JWTError
-from .db import users
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from .db import async_users
+from .passwords import ahash_password, acheck_password, needs_rehash
+
+logger = logging.getLogger(__name__)
 
 SECRET = os.getenv("SECRET_KEY")
 if not SECRET:
@@ -12,6 +18,9 @@ if not SECRET:
 
 ALGO = os.getenv("JWT_ALGORITHM", "HS256")
 
+# detached rehashes, referenced until done so they aren't garbage-collected mid-flight
+_rehash_tasks = set()
+
 
 def create_access_token(data: dict, expires_mins: int = 90):
     data = data.copy()
@@ -27,34 +36,75 @@ def verify_token(token: str):
         return None
 
 
-def signup(name: str, email: str, password: str):
+async def asignup(name: str, email: str, password: str):
     normalized_email = email.lower().strip()
 
-    if users.find_one({"email": normalized_email}):
+    if await async_users.find_one({"email": normalized_email}):
         raise HTTPException(status_code=409, detail="Email already registered")
 
-    hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    hashed = await ahash_password(password)
 
     user_id = str(uuid.uuid4())
-    users.insert_one({
-        "user_id": user_id,
-        "name": name,
-        "email": normalized_email,
-        "password_hash": hashed,
-        "created_at": datetime.now(timezone.utc)
-    })
+    try:
+        await async_users.insert_one({
+            "user_id": user_id,
+            "name": name,
+            "email": normalized_email,
+            "password_hash": hashed,
+            "created_at": datetime.now(timezone.utc)
+        })
+    except DuplicateKeyError:
+        # lost a race with a concurrent signup for the same email
+        raise HTTPException(status_code=409, detail="Email already registered")
 
     token = create_access_token({"user_id": user_id, "email": normalized_email})
     return {"user_id": user_id, "token": token}
 
 
-def login(email: str, password: str):
+async def alogin(email: str, password: str):
     normalized_email = email.lower().strip()
 
-    user = users.find_one({"email": normalized_email})
+    user = await async_users.find_one({"email": normalized_email})
 
-    if not user or not bcrypt.checkpw(password.encode(), user["password_hash"].encode()):
+    if not user or not await acheck_password(password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
     token = create_access_token({"user_id": user["user_id"], "email": normalized_email})
-    return {"token": token, "user_id": user["user_id"]}
\ No newline at end of file
+
+    # BCRYPT_ROUNDS changed since this hash was made, upgrade it while we have the
+    # password; detached, so the login doesn't wait for a second bcrypt round
+    if needs_rehash(user["password_hash"]):
+        task = asyncio.create_task(_arehash(user, password))
+        _rehash_tasks.add(task)
+        task.add_done_callback(_rehash_tasks.discard)
+
+    return {"token": token, "user_id": user["user_id"]}
+
+
+async def _arehash(user: dict, password: str):
+    try:
+        await async_users.update_one(
+            {"_id": user["_id"], "password_hash": user["password_hash"]},
+            {"$set": {"password_hash": await ahash_password(password)}}
+        )
+    except HTTPException:
+        pass  # pool is saturated, upgrade on a later login
+    except Exception:
+        logger.exception("Password rehash failed for user_id=%s", user["user_id"])
+
+
+async def aensure_user_indexes():
+    # existing duplicates fail the build; report them and keep serving without the index
+    for field in ("email", "user_id"):
+        try:
+            await async_users.create_index([(field, ASCENDING)], unique=True)
+        except OperationFailure as exc:
+            duplicates = await async_users.aggregate([
+                {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+                {"$match": {"count": {"$gt": 1}}},
+                {"$limit": 20},
+            ]).to_list(length=None)
+            logger.error(
+                "Unique index on users.%s not created (%s); duplicated values: %s",
+                field, exc, [d["_id"] for d in duplicates],
+            )
\ No newline at end of file
@@ -1,89 +1,419 @@
+import os
 import uuid
-from datetime import datetime
+import base64
+import hashlib
+import asyncio
+import logging
+from datetime import datetime, timezone
+from bson import ObjectId
+from bson.errors import InvalidId
 from fastapi import HTTPException
-from .db import chats  
+from pymongo import ASCENDING, DESCENDING, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from .db import async_chats, async_messages
+from .metrics import timed
 
-#function to create new chat
-def start_chat(user_id: str) -> str:
+# Messages live in their own collection (one document per message) so a chat
+# document stays small no matter how long the conversation gets. Pages are read
+# newest-first by _id, which is monotonic per insert.
+HISTORY_PAGE_SIZE = 50
+CONTEXT_MESSAGES = 10
+CHAT_LIST_PAGE_SIZE = 30
+PREVIEW_CHARS = 120
+
+WRITE_BEHIND_FLUSH_MS = float(os.getenv("WRITE_BEHIND_FLUSH_MS", "50"))
+WRITE_BEHIND_BATCH = int(os.getenv("WRITE_BEHIND_BATCH", "200"))
+# flush a turn before its reply completes; required when several workers serve one user,
+# since a buffered turn is only visible to the worker holding it (set by app/prefork.py)
+WRITE_BEHIND_SYNC_REPLIES = os.getenv("WRITE_BEHIND_SYNC_REPLIES", "false").lower() == "true"
+
+logger = logging.getLogger(__name__)
+
+_SUMMARY_FIELDS = {"_id": 0, "chat_id": 1, "title": 1, "updated_at": 1, "preview": 1}
+_VERSION_FIELDS = {"_id": 0, "updated_at": 1, "summary_upto": 1}
+_CHAT_LIST_SORT = [("updated_at", DESCENDING), ("chat_id", DESCENDING)]
+
+
+def _new_message(chat_id: str, role: str, content: str, now: datetime) -> dict:
+    return {
+        "chat_id": chat_id,
+        "role": role,
+        "content": content,
+        "timestamp": now
+    }
+
+
+def _page_query(chat_id: str, before: str = None) -> dict:
+    query = {"chat_id": chat_id}
+    if before:
+        try:
+            query["_id"] = {"$lt": ObjectId(before)}
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    return query
+
+
+def _serialize_chat(chat: dict, page: list, limit: int):
+    # page is newest-first with one extra row telling us whether older messages exist
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    result = []
+    for m in reversed(page):
+        result.append({
+            "id": str(m["_id"]),
+            "role": m.get("role", "user"),
+            "content": m.get("content", ""),
+            "timestamp": m.get("timestamp").isoformat() if m.get("timestamp") else None
+        })
+
+    return {
+        "chat_id": chat["chat_id"],
+        "title": chat.get("title"),
+        "summary": chat.get("summary"),
+        "messages": result,
+        "next_cursor": result[0]["id"] if has_more and result else None,
+        "created_at": chat["created_at"].isoformat(),
+        "updated_at": chat["updated_at"].isoformat()
+    }
+
+
+def _encode_cursor(chat: dict) -> str:
+    raw = f"{chat['updated_at'].isoformat()}|{chat['chat_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _chat_list_query(user_id: str, cursor: str = None) -> dict:
+    query = {"user_id": user_id}
+    if cursor:
+        # keyset pagination: everything strictly after the last (updated_at, chat_id) seen
+        try:
+            updated_at, chat_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+            updated_at = datetime.fromisoformat(updated_at)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query["$or"] = [
+            {"updated_at": {"$lt": updated_at}},
+            {"updated_at": updated_at, "chat_id": {"$lt": chat_id}},
+        ]
+    return query
+
+
+def _serialize_chat_list(page: list, limit: int):
+    has_more = len(page) > limit
+    page = page[:limit]
+    return {
+        "chats": [
+            {
+                "chat_id": c["chat_id"],
+                "title": c.get("title"),
+                "updated_at": c["updated_at"].isoformat(),
+                "preview": c.get("preview")
+            }
+            for c in page
+        ],
+        "next_cursor": _encode_cursor(page[-1]) if has_more and page else None
+    }
+
+
+async def astart_chat(user_id: str) -> str:
     chat_id = str(uuid.uuid4())
     now = datetime.utcnow()
-    chats.insert_one({
+    await async_chats.insert_one({
         "chat_id": chat_id,
         "user_id": user_id,
         "title": None,
-        "messages": [],
         "created_at": now,
         "updated_at": now
     })
     return chat_id
 
 
-#function to Save message to chat 
-def save_msg(chat_id: str, role: str, content: str):
-    msg = {
-        "role": role,
-        "content": content,
-        "timestamp": datetime.utcnow()
-    }
+async def asave_msg(chat_id: str, role: str, content: str):
+    now = datetime.utcnow()
 
-    result = chats.update_one(
+    result = await async_chats.update_one(
         {"chat_id": chat_id},
-        {
-            "$push": {"messages": msg},
-            "$set": {"updated_at": datetime.utcnow()}
-        }
+        {"$set": {"updated_at": now, "preview": content[:PREVIEW_CHARS]}}
     )
 
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Chat not found")
 
+    await async_messages.insert_one(_new_message(chat_id, role, content, now))
 
-# func to Get chat history
-def get_chat_history(chat_id: str, user_id: str):
-    chat = chats.find_one({"chat_id": chat_id, "user_id": user_id})
+
+async def aget_chat_history(chat_id: str, user_id: str, limit: int = HISTORY_PAGE_SIZE, before: str = None):
+    if write_behind.has_pending(chat_id):
+        # read-your-writes: the previous turn of this chat may still be buffered
+        await write_behind.flush()
+
+    chat = await async_chats.find_one({"chat_id": chat_id, "user_id": user_id})
     if not chat:
-        return None  # return None for access control in main.py
+        return None
 
-    messages = []
-    for m in chat.get("messages", []):
-        messages.append({
-            "role": m.get("role", "user"),
-            "content": m.get("content", ""),
-            "timestamp": m.get("timestamp").isoformat() if m.get("timestamp") else None
-        })
+    page = await (
+        async_messages.find(_page_query(chat_id, before))
+        .sort("_id", DESCENDING)
+        .limit(limit + 1)
+        .to_list(length=limit + 1)
+    )
+    return _serialize_chat(chat, page, limit)
 
-    return {
-        "chat_id": chat["chat_id"],
-        "title": chat.get("title"),
-        "messages": messages,
-        "created_at": chat["created_at"].isoformat(),
-        "updated_at": chat["updated_at"].isoformat()
-    }
 
+async def aget_chat_version(chat_id: str, user_id: str):
+    """updated_at and summary_upto of a chat, answered from the version index alone."""
+    if write_behind.has_pending(chat_id):
+        await write_behind.flush()
+
+    return await async_chats.find_one(
+        {"chat_id": chat_id, "user_id": user_id},
+        _VERSION_FIELDS
+    )
 
-#function to list all chats for a user 
-def list_user_chats(user_id: str):
-    chats_list = list(chats.find({"user_id": user_id}))
-    for c in chats_list:
-        c["_id"] = str(c["_id"])
-        c["chat_id"] = str(c["chat_id"])
-        c["title"] = c.get("title")
-        if "messages" not in c:
-            c["messages"] = []
-    return chats_list
 
+async def alist_user_chats(user_id: str, limit: int = CHAT_LIST_PAGE_SIZE, cursor: str = None):
+    if write_behind.has_pending():
+        # titles and previews of just-finished turns may still be buffered
+        await write_behind.flush()
 
-#function to delete a chat
-def delete_chat(chat_id: str, user_id: str):
-    deleted = chats.delete_one({"chat_id": chat_id, "user_id": user_id})
+    page = await (
+        async_chats.find(_chat_list_query(user_id, cursor), _SUMMARY_FIELDS)
+        .sort(_CHAT_LIST_SORT)
+        .limit(limit + 1)
+        .to_list(length=limit + 1)
+    )
+    return _serialize_chat_list(page, limit)
+
+
+async def adelete_chat(chat_id: str, user_id: str):
+    deleted = await async_chats.delete_one({"chat_id": chat_id, "user_id": user_id})
     if deleted.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Chat not found")
+    # a buffered turn flushed after this point would leave orphan messages behind
+    await write_behind.discard(chat_id)
+    await async_messages.delete_many({"chat_id": chat_id})
     return {"deleted": True}
 
-def set_chat_title(chat_id: str, title: str):
-    result = chats.update_one(
+
+async def aset_chat_title(chat_id: str, title: str):
+    result = await async_chats.update_one(
         {"chat_id": chat_id},
         {"$set": {"title": title, "updated_at": datetime.utcnow()}}
     )
     if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Chat not found")
\ No newline at end of file
+        raise HTTPException(status_code=404, detail="Chat not found")
+
+
+async def aget_unsummarised_messages(chat_id: str, keep_recent: int, limit: int):
+    """Up to limit of the oldest messages newer than the chat's summary cursor,
+    never including the newest keep_recent."""
+    chat = await async_chats.find_one({"chat_id": chat_id}, {"summary": 1, "summary_upto": 1})
+    if not chat:
+        return None, []
+
+    id_range = {}
+    if chat.get("summary_upto"):
+        id_range["$gt"] = chat["summary_upto"]
+    if keep_recent:
+        recent = await (
+            async_messages.find({"chat_id": chat_id}, {"_id": 1})
+            .sort("_id", DESCENDING)
+            .limit(keep_recent)
+            .to_list(length=keep_recent)
+        )
+        if len(recent) < keep_recent:
+            return chat.get("summary"), []
+        id_range["$lt"] = recent[-1]["_id"]
+
+    query = {"chat_id": chat_id}
+    if id_range:
+        query["_id"] = id_range
+    docs = await async_messages.find(query).sort("_id", ASCENDING).limit(limit).to_list(length=limit)
+    return chat.get("summary"), docs
+
+
+async def aset_chat_summary(chat_id: str, summary: str, upto: ObjectId):
+    await async_chats.update_one(
+        {"chat_id": chat_id},
+        {"$set": {"summary": summary, "summary_upto": upto}}
+    )
+
+
+async def aensure_indexes():
+    await async_chats.create_index([("chat_id", ASCENDING)], unique=True)
+    # covers aget_chat_version, so conditional history requests never touch the documents
+    await async_chats.create_index(
+        [("chat_id", ASCENDING), ("user_id", ASCENDING), ("updated_at", ASCENDING), ("summary_upto", ASCENDING)]
+    )
+    await async_chats.create_index(
+        [("user_id", ASCENDING), ("updated_at", DESCENDING), ("chat_id", DESCENDING)]
+    )
+    await async_messages.create_index([("chat_id", ASCENDING), ("_id", DESCENDING)])
+
+
+def _migrated_message_id(chat_id: str, index: int, when: datetime) -> ObjectId:
+    # same timestamp prefix as a live insert so history pages keep sorting by _id;
+    # the rest is fixed by (chat, position), so copying a chat twice is a no-op
+    seconds = int(when.replace(tzinfo=timezone.utc).timestamp())
+    chat_part = hashlib.sha1(chat_id.encode()).digest()[:5]
+    return ObjectId(seconds.to_bytes(4, "big") + chat_part + index.to_bytes(3, "big"))
+
+
+async def amigrate_embedded_messages() -> int:
+    """Move messages still stored in a chat's `messages` array into the messages collection.
+
+    Messages are copied before the array is removed, under deterministic _ids, so
+    workers starting together (or a rerun after a crash) only hit duplicate keys.
+    """
+    migrated = 0
+    cursor = async_chats.find({"messages": {"$exists": True}}, {"chat_id": 1, "messages": 1, "created_at": 1})
+    async for chat in cursor:
+        docs = []
+        for i, m in enumerate(chat.get("messages") or []):
+            when = m.get("timestamp") or chat.get("created_at") or datetime(1970, 1, 1)
+            doc = _new_message(chat["chat_id"], m.get("role", "user"), m.get("content", ""), when)
+            doc["_id"] = _migrated_message_id(chat["chat_id"], i, when)
+            docs.append(doc)
+        if docs:
+            try:
+                await async_messages.insert_many(docs, ordered=False)
+            except BulkWriteError as exc:
+                if any(e.get("code") != 11000 for e in exc.details.get("writeErrors", [])):
+                    raise
+        await async_chats.update_one({"_id": chat["_id"]}, {"$unset": {"messages": ""}})
+        migrated += 1
+    return migrated
+
+
+class WriteBehindBuffer:
+    """Buffers the writes of finished chat turns and persists them in batches.
+
+    A turn (user message, assistant message, optional title) is recorded without
+    touching Mongo; a background task flushes every WRITE_BEHIND_FLUSH_MS, or as soon
+    as WRITE_BEHIND_BATCH messages are queued, as one bulk insert into messages
+    plus one bulk of coalesced per-chat $set updates. stop() flushes what is left.
+    """
+
+    def __init__(self, flush_interval_ms: float = WRITE_BEHIND_FLUSH_MS, max_batch: int = WRITE_BEHIND_BATCH):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+        self._messages = []
+        self._chat_updates = {}
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def has_pending(self, chat_id: str = None) -> bool:
+        # a flush in progress may hold this chat's writes too
+        if self._flush_lock.locked():
+            return True
+        return chat_id in self._chat_updates if chat_id else bool(self._chat_updates)
+
+    def record_turn(self, chat_id: str, user_content: str, assistant_content: str = None, title: str = None):
+        """Queue a turn's writes. Safe to call from a cancelled request's cleanup."""
+        now = datetime.utcnow()
+        contents = [("user", user_content)]
+        if assistant_content is not None:
+            contents.append(("assistant", assistant_content))
+
+        for role, content in contents:
+            # _id assigned here so ordering follows the turn, not the flush
+            self._messages.append({"_id": ObjectId(), **_new_message(chat_id, role, content, now)})
+
+        update = self._chat_updates.setdefault(chat_id, {})
+        update["updated_at"] = now
+        update["preview"] = contents[-1][1][:PREVIEW_CHARS]
+        if title:
+            update["title"] = title
+
+        if len(self._messages) >= self.max_batch:
+            self._wakeup.set()
+
+    async def discard(self, chat_id: str):
+        """Drop a chat's buffered writes, waiting out a flush that may be writing them."""
+        async with self._flush_lock:
+            self._messages = [doc for doc in self._messages if doc["chat_id"] != chat_id]
+            self._chat_updates.pop(chat_id, None)
+
+    async def flush_for_reply(self):
+        """With WRITE_BEHIND_SYNC_REPLIES, persist buffered turns before a reply completes."""
+        if not WRITE_BEHIND_SYNC_REPLIES:
+            return
+        try:
+            await self.flush()
+        except Exception:
+            pass  # already logged and requeued; the background task retries
+
+    async def flush(self):
+        async with self._flush_lock:
+            inserts, self._messages = self._messages, []
+            updates, self._chat_updates = self._chat_updates, {}
+            if not inserts and not updates:
+                return
+            with timed("save_msg_flush"):
+                await self._write(inserts, updates)
+
+    async def _write(self, inserts: list, updates: dict):
+        try:
+            if inserts:
+                # _ids are preassigned, so order doesn't matter and a retry of a
+                # row that already landed fails harmlessly with a duplicate key
+                await async_messages.bulk_write([InsertOne(doc) for doc in inserts], ordered=False)
+        except BulkWriteError as exc:
+            failed = {e["index"] for e in exc.details.get("writeErrors", []) if e.get("code") != 11000}
+            if failed:
+                logger.error("Write-behind flush failed for %d messages, will retry", len(failed))
+                self._requeue([op for i, op in enumerate(inserts) if i in failed], updates)
+                raise
+        except Exception:
+            logger.exception("Write-behind flush failed, retrying %d messages", len(inserts))
+            self._requeue(inserts, updates)
+            raise
+
+        if not updates:
+            return
+        try:
+            await async_chats.bulk_write(
+                [UpdateOne({"chat_id": cid}, {"$set": fields}) for cid, fields in updates.items()],
+                ordered=False
+            )
+        except Exception:
+            logger.exception("Write-behind flush failed for %d chat updates", len(updates))
+            self._requeue([], updates)
+            raise
+
+    def _requeue(self, inserts: list, updates: dict):
+        self._messages = inserts + self._messages
+        for cid, fields in updates.items():
+            # anything recorded since the swap is newer and wins
+            self._chat_updates[cid] = {**fields, **self._chat_updates.get(cid, {})}
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                pass  # already logged, the ops stay queued for the next round
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+write_behind = WriteBehindBuffer()
\ No newline at end of file
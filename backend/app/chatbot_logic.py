@@ -1,11 +1,26 @@
 import os
 import re
+import asyncio
 import logging
-from langchain_groq import ChatGroq
+import threading
+from functools import lru_cache
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
 from .vector_store import get_retriever
+from .answer_cache import get_answer_cache, CACHE_ENABLED
+from .metrics import LLMMetricsCallback, timed
+from .llm_gateway import LLMGateway, LLM_TIMEOUT
+from .intent_router import route, MEDICAL, NON_MEDICAL, EMERGENCY, SELF_HARM
+from .context_builder import (
+    count_tokens,
+    fit_documents,
+    format_message,
+    truncate_tokens,
+    PROMPT_TOKEN_BUDGET,
+    CONTEXT_TOKEN_BUDGET,
+    SUMMARY_TOKEN_BUDGET
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,6 +33,7 @@ if not os.getenv("GROQ_API_KEY"):
 _retriever = None
 _llm = None
 _chain = None
+_chain_lock = threading.Lock()
 
 def _get_retriever():
     global _retriever
@@ -27,14 +43,29 @@ def _get_retriever():
     return _retriever
 
 
-def _get_llm() -> ChatGroq:
+def _build_model(model: str):
+    from langchain_groq import ChatGroq
+
+    # retries and timeouts are owned by the gateway; GROQ_BASE_URL allows a local fake server
+    return ChatGroq(
+        model=model,
+        temperature=0.3,
+        groq_api_key=os.getenv("GROQ_API_KEY"),
+        base_url=os.getenv("GROQ_BASE_URL") or None,
+        timeout=LLM_TIMEOUT,
+        max_retries=0,
+        callbacks=[LLMMetricsCallback()],
+    )
+
+
+def _get_llm() -> LLMGateway:
     global _llm
     if _llm is None:
         logger.info("Initialising LLM...")
-        _llm = ChatGroq(
-            model=os.getenv("LLM_MODEL", "llama-3.1-8b-instant"),
-            temperature=0.3,
-            groq_api_key=os.getenv("GROQ_API_KEY"),
+        secondary = os.getenv("LLM_SECONDARY_MODEL")
+        _llm = LLMGateway(
+            _build_model(os.getenv("LLM_MODEL", "llama-3.1-8b-instant")),
+            secondary=_build_model(secondary) if secondary else None,
         )
     return _llm
 
@@ -127,14 +158,58 @@ NON_MEDICAL_REPLY = (
 )
 
 
+EMERGENCY_REPLY = (
+    "⚠️ This may be a medical emergency. "
+    "Seek immediate medical help or call emergency services."
+)
+
+SELF_HARM_REPLY = (
+    "I'm really sorry you're feeling this way. Please reach out to someone you trust "
+    "or a mental health helpline, and call emergency services if you are in immediate danger."
+)
+
+ERROR_REPLY = (
+    "I'm sorry, I encountered an error while processing your request. "
+    "Please try again later."
+)
+
+_CANNED_REPLIES = {
+    NON_MEDICAL: NON_MEDICAL_REPLY,
+    EMERGENCY: EMERGENCY_REPLY,
+    SELF_HARM: SELF_HARM_REPLY,
+}
+
+
 def _is_non_medical(text: str) -> bool:
     return bool(_NON_MEDICAL_PATTERN.match(text))
 
 
+def _fast_path_intent(user_query: str, chat_history: str) -> str:
+    """Intent of the query; anything but "medical" is answered with a canned reply."""
+    if _is_non_medical(user_query):
+        return NON_MEDICAL
+    return route(user_query, chat_history)
+
+
 def _format_docs(docs) -> str:
     if not docs:
         return "No relevant context found."
-    return "\n\n".join(doc.page_content for doc in docs)
+    return "\n\n".join(fit_documents([doc.page_content for doc in docs], CONTEXT_TOKEN_BUDGET))
+
+
+@lru_cache(maxsize=1)
+def _template_tokens() -> int:
+    # counted on the first prompt build, so importing this module doesn't load tiktoken
+    return count_tokens(MEDIBOT_TEMPLATE)
+
+
+def history_token_budget(question: str) -> int:
+    """What's left of PROMPT_TOKEN_BUDGET for history once the template, the
+    question and a full retrieved context are accounted for."""
+    return max(
+        PROMPT_TOKEN_BUDGET - _template_tokens() - CONTEXT_TOKEN_BUDGET - count_tokens(question),
+        0,
+    )
 
 
 def _sanitise_input(text: str) -> str:
@@ -158,15 +233,33 @@ def _build_chain(retriever, llm):
     )
 
 
+def _cache_lookup(user_query: str, chat_history: str):
+    if not CACHE_ENABLED:
+        return None, None
+    try:
+        return get_answer_cache().lookup(user_query, chat_history)
+    except Exception:
+        logger.exception("Answer cache lookup failed")
+        return None, None
+
+
+def _cache_store(vector, response: str, chat_history: str):
+    if vector is not None and response and response != ERROR_REPLY:
+        get_answer_cache().store(vector, response, chat_history)
+
+
 def _get_chain():
     global _chain
     if _chain is None:
-        logger.info("Building RAG chain...")
-        _chain = _build_chain(_get_retriever(), _get_llm())
+        # requests that arrive during warm-up wait here instead of building a second chain
+        with _chain_lock:
+            if _chain is None:
+                logger.info("Building RAG chain...")
+                _chain = _build_chain(_get_retriever(), _get_llm())
     return _chain
 
 
-def get_chatbot_response(
+async def aget_chatbot_response(
     conversation_id: str,
     user_query: str,
     chat_history: str = "",
@@ -175,29 +268,68 @@ def get_chatbot_response(
     if not user_query:
         return "Please enter a valid question."
 
-    if _is_non_medical(user_query):
-        logger.info("conversation_id=%s | non-medical input blocked: %r", conversation_id, user_query)
-        return NON_MEDICAL_REPLY
+    intent = await asyncio.to_thread(_fast_path_intent, user_query, chat_history)
+    if intent != MEDICAL:
+        logger.info("conversation_id=%s | fast-path %s reply", conversation_id, intent)
+        return _CANNED_REPLIES[intent]
 
     logger.info("conversation_id=%s | query_length=%d", conversation_id, len(user_query))
 
+    cached, vector = await asyncio.to_thread(_cache_lookup, user_query, chat_history)
+    if cached is not None:
+        logger.info("conversation_id=%s | answer cache hit", conversation_id)
+        return cached
+
     try:
-        response = _get_chain().invoke({"question": user_query, "history": chat_history})
+        chain = await asyncio.to_thread(_get_chain)
+        response = await chain.ainvoke({"question": user_query, "history": chat_history})
+        _cache_store(vector, response, chat_history)
         return response
     except Exception:
         logger.exception("LLM chain failed for conversation_id=%s", conversation_id)
-        return (
-            "I'm sorry, I encountered an error while processing your request. "
-            "Please try again later."
-        )
+        return ERROR_REPLY
 
 
-def generate_chat_title(first_message: str) -> str:
-    first_message = _sanitise_input(first_message)
-    if not first_message:
-        return "New Medical Chat"
+async def astream_chatbot_response(
+    conversation_id: str,
+    user_query: str,
+    chat_history: str = "",
+):
+    user_query = _sanitise_input(user_query)
+    if not user_query:
+        yield "Please enter a valid question."
+        return
+
+    intent = await asyncio.to_thread(_fast_path_intent, user_query, chat_history)
+    if intent != MEDICAL:
+        logger.info("conversation_id=%s | fast-path %s reply", conversation_id, intent)
+        yield _CANNED_REPLIES[intent]
+        return
+
+    logger.info("conversation_id=%s | stream query_length=%d", conversation_id, len(user_query))
 
-    title_prompt = (
+    cached, vector = await asyncio.to_thread(_cache_lookup, user_query, chat_history)
+    if cached is not None:
+        logger.info("conversation_id=%s | answer cache hit", conversation_id)
+        yield cached
+        return
+
+    try:
+        # first call loads the embedding model + index, keep it off the event loop
+        chain = await asyncio.to_thread(_get_chain)
+        parts = []
+        async for chunk in chain.astream({"question": user_query, "history": chat_history}):
+            if chunk:
+                parts.append(chunk)
+                yield chunk
+        _cache_store(vector, "".join(parts), chat_history)
+    except Exception:
+        logger.exception("LLM stream failed for conversation_id=%s", conversation_id)
+        yield ERROR_REPLY
+
+
+def _title_prompt(first_message: str) -> str:
+    return (
         "Convert this user's first query into a short medical chat title.\n"
         "Rules:\n"
         "• Max 6 words\n"
@@ -207,9 +339,71 @@ def generate_chat_title(first_message: str) -> str:
         f'Query: "{first_message}"'
     )
 
+
+async def agenerate_chat_title(first_message: str) -> str:
+    first_message = _sanitise_input(first_message)
+    if not first_message:
+        return "New Medical Chat"
+
     try:
-        title = _get_llm().invoke(title_prompt).content.strip().replace("\n", "")
+        result = await _get_llm().ainvoke(_title_prompt(first_message))
+        title = result.content.strip().replace("\n", "")
         return title if title else "Medical Query"
     except Exception:
         logger.exception("Title generation failed")
-        return "Medical Query"
\ No newline at end of file
+        return "Medical Query"
+
+
+TITLE_TIMEOUT = float(os.getenv("TITLE_TIMEOUT", "2.0"))
+
+_TITLE_STOPWORDS = frozenset(
+    "a an and are about can could do does for from have how i if in is it me my of on or "
+    "should the to what when where which who why will with you your please tell explain "
+    "know get having am was been much many any some there".split()
+)
+
+
+def fallback_chat_title(first_message: str) -> str:
+    """Cheap local title: the first few content words of the query."""
+    words = re.findall(r"[A-Za-z0-9][A-Za-z0-9'-]*", first_message)
+    keywords = [w for w in words if w.lower() not in _TITLE_STOPWORDS][:5]
+    if not keywords:
+        return "Medical Query"
+    return " ".join(w if w.isupper() else w.capitalize() for w in keywords)
+
+
+def start_chat_title(first_message: str) -> asyncio.Task:
+    """Kick off LLM title generation so it runs alongside the answer."""
+    async def generate():
+        with timed("title_generation"):
+            return await agenerate_chat_title(first_message)
+
+    return asyncio.create_task(generate())
+
+
+async def await_chat_title(task: asyncio.Task, first_message: str, timeout: float = TITLE_TIMEOUT) -> str:
+    """Result of a start_chat_title task, or the local fallback if it's still not done."""
+    try:
+        return await asyncio.wait_for(task, timeout=timeout)
+    except asyncio.TimeoutError:
+        logger.info("Title generation exceeded %.1fs, using local fallback", timeout)
+        return fallback_chat_title(first_message)
+
+
+async def asummarise_history(previous_summary: str, messages: list) -> str:
+    """Fold older messages into the chat's rolling summary.
+
+    messages should come from context_builder.summary_batch, so all of them fit.
+    """
+    transcript = "\n".join(format_message(m) for m in messages)
+    prompt = (
+        "You maintain a running summary of a conversation between a user and a medical "
+        "information assistant.\n"
+        f"Update the summary with the new messages in at most {SUMMARY_TOKEN_BUDGET // 2} words.\n"
+        "Keep the user's conditions, symptoms, medications and open questions; drop formatting, "
+        "disclaimers and repeated advice. Return ONLY the summary.\n\n"
+        f"Current summary:\n{previous_summary or '(none)'}\n\n"
+        f"New messages:\n{truncate_tokens(transcript, PROMPT_TOKEN_BUDGET)}"
+    )
+    result = await _get_llm().ainvoke(prompt)
+    return result.content.strip()
\ No newline at end of file
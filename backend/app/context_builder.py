@@ -0,0 +1,92 @@
+"""Token-aware assembly of the prompt's history and retrieved context.
+
+Counts use tiktoken's cl100k_base encoding, which tracks the Llama tokenizer closely
+enough for budgeting. History is filled newest-first until its budget runs out, behind
+the chat's rolling summary of older turns.
+"""
+import os
+from functools import lru_cache
+
+import tiktoken
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2500"))
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", "400"))
+# messages newer than this stay verbatim; older ones are folded into the summary
+SUMMARY_KEEP_RECENT = int(os.getenv("SUMMARY_KEEP_RECENT", "10"))
+SUMMARY_MIN_BATCH = int(os.getenv("SUMMARY_MIN_BATCH", "4"))
+# messages read per summarisation round; each round is further cut to the prompt budget
+SUMMARY_MAX_BATCH = int(os.getenv("SUMMARY_MAX_BATCH", "100"))
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str) -> int:
+    return len(_encoding().encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, budget: int) -> str:
+    tokens = _encoding().encode(text, disallowed_special=())
+    if len(tokens) <= budget:
+        return text
+    return _encoding().decode(tokens[:budget]) + " …"
+
+
+def format_message(m: dict) -> str:
+    return f"{m['role']}: {m['content']}"
+
+
+def summary_batch(messages: list, budget: int = PROMPT_TOKEN_BUDGET) -> list:
+    """Oldest-first prefix of messages whose transcript fits in budget (at least one)."""
+    batch = []
+    used = 0
+    for m in messages:
+        cost = count_tokens(format_message(m)) + 1
+        if batch and used + cost > budget:
+            break
+        batch.append(m)
+        used += cost
+    return batch
+
+
+def build_history(messages: list, summary: str = None, budget: int = PROMPT_TOKEN_BUDGET) -> str:
+    """Summary of older turns plus as many of the newest messages as fit in budget."""
+    lines = []
+    used = 0
+    if summary:
+        summary_line = "Summary of earlier conversation: " + truncate_tokens(summary, SUMMARY_TOKEN_BUDGET)
+        used = count_tokens(summary_line)
+
+    for m in reversed(messages):
+        line = format_message(m)
+        cost = count_tokens(line) + 1  # newline
+        if used + cost > budget:
+            if not lines:
+                # always keep the latest message, trimmed to what's left
+                lines.append(truncate_tokens(line, max(budget - used, 0)))
+            break
+        lines.append(line)
+        used += cost
+
+    lines.reverse()
+    if summary:
+        lines.insert(0, summary_line)
+    return "\n".join(lines)
+
+
+def fit_documents(texts: list, budget: int = CONTEXT_TOKEN_BUDGET) -> list:
+    """Retrieved chunks in rank order until the context budget is spent."""
+    kept = []
+    used = 0
+    for text in texts:
+        cost = count_tokens(text)
+        if used + cost > budget:
+            if not kept:
+                kept.append(truncate_tokens(text, budget))
+            break
+        kept.append(text)
+        used += cost
+    return kept
\ No newline at end of file
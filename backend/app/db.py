@@ -1,16 +1,36 @@
 import os
 import certifi
 from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from .metrics import MongoPoolMetrics
 
 MONGO_URI = os.getenv("MONGO_URI")
+MONGO_DB = os.getenv("MONGO_DB", "medibot_db")
+# Atlas needs TLS; a local mongod (benchmarks) usually runs without it
+MONGO_TLS = os.getenv("MONGO_TLS", "true").lower() == "true"
 
-client = MongoClient(
-    MONGO_URI,
-    tls=True,
-    tlsCAFile=certifi.where()
-)
+_tls_kwargs = {"tls": True, "tlsCAFile": certifi.where()} if MONGO_TLS else {}
 
-db = client["medibot_db"]
+if MONGO_URI == "mongomock://":
+    # in-memory stand-in for offline load tests; needs mongomock-motor installed
+    import mongomock
+    from mongomock_motor import AsyncMongoMockClient
+
+    client = mongomock.MongoClient()
+    async_client = AsyncMongoMockClient()
+else:
+    client = MongoClient(MONGO_URI, **_tls_kwargs)
+    # async client for the request path; motor binds to the running loop lazily
+    async_client = AsyncIOMotorClient(MONGO_URI, event_listeners=[MongoPoolMetrics()], **_tls_kwargs)
+
+db = client[MONGO_DB]
 
 users = db["users"]
-chats = db["chats"]
\ No newline at end of file
+chats = db["chats"]
+messages = db["messages"]
+
+async_db = async_client[MONGO_DB]
+
+async_users = async_db["users"]
+async_chats = async_db["chats"]
+async_messages = async_db["messages"]
\ No newline at end of file
@@ -0,0 +1,138 @@
+import os
+import time
+import queue
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from langchain_core.embeddings import Embeddings
+
+from .metrics import timed
+
+logger = logging.getLogger(__name__)
+
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "32"))
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "5"))
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "4096"))
+
+
+def normalise_query(text: str) -> str:
+    """The one form a query is embedded in, so the intent router, answer cache and
+    retriever share a single embedding-cache entry. bge-small is uncased, so
+    lowercasing and collapsing whitespace don't change the vector's meaning."""
+    return " ".join(text.lower().split())
+
+
+class BatchingEmbeddings(Embeddings):
+    """Wraps an embedding model so concurrent embed_query calls share one forward pass.
+
+    Queries are collected by a background thread for up to ``max_wait_ms`` (or until
+    ``max_batch_size`` are queued) and embedded with a single ``embed_documents`` call.
+    Results are kept in an LRU cache keyed by the query string.
+    """
+
+    def __init__(self, inner: Embeddings, max_batch_size: int = EMBED_MAX_BATCH,
+                 max_wait_ms: float = EMBED_MAX_WAIT_MS, cache_size: int = EMBED_CACHE_SIZE):
+        self.inner = inner
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.batches = 0
+        self.batched_queries = 0
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text):
+        vector = self._cache_get(text)
+        if vector is not None:
+            return vector
+
+        future = Future()
+        self._ensure_worker()
+        with timed("embedding"):
+            self._queue.put((text, future))
+            vector = future.result()
+        self._cache_put(text, vector)
+        return vector
+
+    def _cache_get(self, text):
+        if self.cache_size <= 0:
+            return None
+        with self._cache_lock:
+            vector = self._cache.get(text)
+            if vector is None:
+                self.cache_misses += 1
+                return None
+            self._cache.move_to_end(text)
+            self.cache_hits += 1
+            return vector
+
+    def _cache_put(self, text, vector):
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[text] = vector
+            self._cache.move_to_end(text)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="embedding-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            unique = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                vectors = self.inner.embed_documents(unique)
+            except Exception as exc:
+                logger.exception("Batched embedding failed for %d queries", len(unique))
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+
+            self.batches += 1
+            self.batched_queries += len(batch)
+            by_text = dict(zip(unique, vectors))
+            for text, future in batch:
+                future.set_result(by_text[text])
+
+    def stats(self) -> dict:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "cache_entries": len(self._cache),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": round(self.cache_hits / lookups, 4) if lookups else 0.0,
+            "batches": self.batches,
+            "avg_batch_size": round(self.batched_queries / self.batches, 2) if self.batches else 0.0,
+        }
\ No newline at end of file
@@ -0,0 +1,161 @@
+"""BM25 lexical index and dense + lexical fusion.
+
+The BM25 index is built from the same chunks as the FAISS index (``index_store.save_index``)
+and stored as precomputed postings: for every term, the chunk positions it occurs in and
+their final BM25 weights. A query is then a handful of array slices and one bincount.
+"""
+import os
+import re
+import json
+import math
+import logging
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+
+logger = logging.getLogger(__name__)
+
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
+RRF_K = int(os.getenv("RRF_K", "60"))
+LEXICAL_K = int(os.getenv("LEXICAL_K", "20"))
+
+BM25_VOCAB = "bm25_vocab.json"
+BM25_ARRAYS = ("offsets", "docs", "weights")
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i if in is it its me my "
+    "of on or should so than that the their them then there these they this to was we "
+    "what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> list:
+    return [t for t in _TOKEN_PATTERN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, vocab: dict, offsets, docs, weights):
+        self.vocab = vocab
+        self.offsets = offsets
+        self.docs = docs
+        self.weights = weights
+
+    @classmethod
+    def build(cls, texts, k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        term_counts = [Counter(tokenize(t)) for t in texts]
+        lengths = np.array([sum(tc.values()) for tc in term_counts], dtype=np.float32)
+        avgdl = float(lengths.mean()) if len(lengths) and lengths.mean() else 1.0
+        n = len(texts)
+
+        postings = defaultdict(list)
+        for pos, tc in enumerate(term_counts):
+            for term, tf in tc.items():
+                postings[term].append((pos, tf))
+
+        vocab, offsets, docs, weights = {}, [0], [], []
+        for term in sorted(postings):
+            plist = postings[term]
+            idf = math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for pos, tf in plist:
+                docs.append(pos)
+                weights.append(idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths[pos] / avgdl)))
+            vocab[term] = len(vocab)
+            offsets.append(len(docs))
+
+        return cls(
+            vocab,
+            np.asarray(offsets, dtype=np.int64),
+            np.asarray(docs, dtype=np.int32),
+            np.asarray(weights, dtype=np.float32),
+        )
+
+    def search(self, query: str, k: int = LEXICAL_K) -> list:
+        """Top-k (position, score) pairs for query."""
+        term_ids = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+        if not term_ids:
+            return []
+
+        spans = [(self.offsets[i], self.offsets[i + 1]) for i in term_ids]
+        docs = np.concatenate([self.docs[a:b] for a, b in spans])
+        weights = np.concatenate([self.weights[a:b] for a, b in spans])
+
+        candidates, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+        if len(scores) > k:
+            top = np.argpartition(-scores, k)[:k]
+            top = top[np.argsort(-scores[top])]
+        else:
+            top = np.argsort(-scores)
+        return [(int(candidates[i]), float(scores[i])) for i in top]
+
+    def save(self, path: str):
+        with open(os.path.join(path, BM25_VOCAB), "w", encoding="utf8") as f:
+            json.dump(self.vocab, f)
+        for name in BM25_ARRAYS:
+            np.save(os.path.join(path, f"bm25_{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True):
+        """Load from path, or None if no lexical index was written there."""
+        vocab_path = os.path.join(path, BM25_VOCAB)
+        if not os.path.exists(vocab_path):
+            return None
+        with open(vocab_path, encoding="utf8") as f:
+            vocab = json.load(f)
+        arrays = [
+            np.load(os.path.join(path, f"bm25_{name}.npy"), mmap_mode="r" if mmap else None)
+            for name in BM25_ARRAYS
+        ]
+        return cls(vocab, *arrays)
+
+
+def bm25_files() -> list:
+    return [BM25_VOCAB] + [f"bm25_{name}.npy" for name in BM25_ARRAYS]
+
+
+def _doc_key(doc):
+    return doc.id or doc.page_content
+
+
+def reciprocal_rank_fusion(rankings, k: int, rrf_k: int = RRF_K) -> list:
+    scores, docs = {}, {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            key = _doc_key(doc)
+            docs.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [docs[key] for key in best]
+
+
+_lexical_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="bm25")
+
+
+class HybridRetriever(BaseRetriever):
+    """Runs the dense retriever and BM25 side by side and fuses them with RRF."""
+
+    dense: BaseRetriever
+    lexical: Any
+    vectorstore: Any
+    k: int = 5
+    lexical_k: int = LEXICAL_K
+    rrf_k: int = RRF_K
+
+    def lexical_documents(self, query: str) -> list:
+        docs = []
+        for pos, _ in self.lexical.search(query, self.lexical_k):
+            doc = self.vectorstore.docstore.search(self.vectorstore.index_to_docstore_id[pos])
+            if not isinstance(doc, str):  # docstores return an error string on a miss
+                docs.append(doc)
+        return docs
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun):
+        lexical = _lexical_pool.submit(self.lexical_documents, query)
+        dense = self.dense.invoke(query, config={"callbacks": run_manager.get_child()})
+        return reciprocal_rank_fusion([dense, lexical.result()], self.k, self.rrf_k)
\ No newline at end of file
@@ -0,0 +1,202 @@
+"""Pickle-free on-disk format for the FAISS vector store.
+
+    index.faiss       native faiss index, opened with IO_FLAG_MMAP when serving
+    docstore.sqlite   chunks(pos, doc_id, content, metadata) read lazily by position
+    bm25_*            BM25 postings over the same chunk positions (hybrid_retrieval)
+
+Every uvicorn worker maps the same files, so vectors and chunk text are shared through
+the OS page cache instead of being unpickled into each process. Stores written before
+this format (index.pkl) still load, with a warning.
+"""
+import os
+import json
+import sqlite3
+import logging
+import tempfile
+import threading
+from collections.abc import Mapping
+
+import faiss
+from langchain_core.documents import Document
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+from .hybrid_retrieval import BM25Index, bm25_files
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.sqlite"
+LEGACY_PICKLE_FILE = "index.pkl"
+
+
+class StaleDocstoreError(RuntimeError):
+    """docstore.sqlite was replaced before this process first read the loaded index."""
+
+
+class _SQLiteChunks:
+    """Read-only access to the docstore.sqlite file that was current at load time.
+
+    SQLite connections must not be carried across fork, so each process (e.g. each
+    pre-fork worker) opens its own on first use. save_index swaps in a new file by
+    rename, and a late connection by path would read the new chunks with the old
+    faiss positions. So the file's identity is recorded at load, and a connection
+    that reaches a different file raises StaleDocstoreError instead of returning
+    wrong chunks. Once connected, a process keeps the file it opened. Queries are
+    point lookups; a lock serialises them on the process's connection.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._identity = _file_identity(path)
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._pid != os.getpid():
+            # immutable: the file is never written in place, so skip locking and change checks
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+            if _file_identity(self.path) != self._identity:
+                conn.close()
+                raise StaleDocstoreError(f"{self.path} was replaced after this index was loaded")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def query_one(self, sql: str, args=()):
+        with self._lock:
+            return self._connection().execute(sql, args).fetchone()
+
+    def query_all(self, sql: str, args=()):
+        with self._lock:
+            return self._connection().execute(sql, args).fetchall()
+
+
+def _file_identity(path: str):
+    st = os.stat(path)
+    return st.st_dev, st.st_ino
+
+
+class SQLiteIndexMap(Mapping):
+    """faiss position -> docstore id, looked up on demand."""
+
+    def __init__(self, chunks: _SQLiteChunks):
+        self._chunks = chunks
+        self._len = chunks.query_one("SELECT COUNT(*) FROM chunks")[0]
+
+    def __getitem__(self, pos):
+        row = self._chunks.query_one("SELECT doc_id FROM chunks WHERE pos = ?", (int(pos),))
+        if row is None:
+            raise KeyError(pos)
+        return row[0]
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return iter(range(self._len))
+
+
+class SQLiteDocstore(Docstore):
+    """Docstore that reads chunk text and metadata by id from docstore.sqlite."""
+
+    def __init__(self, chunks: _SQLiteChunks):
+        self._chunks = chunks
+
+    def search(self, search: str):
+        row = self._chunks.query_one(
+            "SELECT content, metadata FROM chunks WHERE doc_id = ?", (search,)
+        )
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=search, page_content=row[0], metadata=json.loads(row[1]))
+
+    def add(self, texts):
+        raise NotImplementedError("SQLiteDocstore is read-only, rebuild with app.ingest")
+
+    def delete(self, ids):
+        raise NotImplementedError("SQLiteDocstore is read-only, rebuild with app.ingest")
+
+
+def has_safe_format(path: str) -> bool:
+    return os.path.exists(os.path.join(path, DOCSTORE_FILE))
+
+
+def load_index(path: str, embeddings, mmap: bool = True) -> FAISS:
+    """Load a store for serving: vectors memory-mapped, chunks read lazily."""
+    if not has_safe_format(path):
+        logger.warning("No %s in %s, falling back to the legacy pickle store", DOCSTORE_FILE, path)
+        return FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+
+    flags = 0
+    if mmap:
+        # IO_FLAG_MMAP_IFC (faiss >= 1.9) also maps flat codes zero-copy
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+    index = faiss.read_index(os.path.join(path, INDEX_FILE), flags)
+    chunks = _SQLiteChunks(os.path.join(path, DOCSTORE_FILE))
+    index_map = SQLiteIndexMap(chunks)
+    if len(index_map) != index.ntotal:
+        # loaded while save_index was swapping files in; the watcher retries on its next poll
+        raise RuntimeError(f"{DOCSTORE_FILE} has {len(index_map)} chunks but {INDEX_FILE} "
+                           f"has {index.ntotal} vectors")
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=SQLiteDocstore(chunks),
+        index_to_docstore_id=index_map,
+    )
+
+
+def load_index_for_update(path: str, embeddings) -> FAISS:
+    """Load a store fully into memory so it can be edited and re-saved."""
+    if not has_safe_format(path):
+        return FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+
+    index = faiss.read_index(os.path.join(path, INDEX_FILE))
+    chunks = _SQLiteChunks(os.path.join(path, DOCSTORE_FILE))
+    rows = chunks.query_all("SELECT pos, doc_id, content, metadata FROM chunks ORDER BY pos")
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore({
+            doc_id: Document(id=doc_id, page_content=content, metadata=json.loads(meta))
+            for _, doc_id, content, meta in rows
+        }),
+        index_to_docstore_id={pos: doc_id for pos, doc_id, _, _ in rows},
+    )
+
+
+def _write_docstore(db: FAISS, path: str):
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(
+            "CREATE TABLE chunks (pos INTEGER PRIMARY KEY, doc_id TEXT UNIQUE NOT NULL, "
+            "content TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        rows = []
+        for pos in range(db.index.ntotal):
+            doc_id = db.index_to_docstore_id[pos]
+            doc = db.docstore.search(doc_id)
+            rows.append((pos, doc_id, doc.page_content, json.dumps(doc.metadata)))
+        conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?)", rows)
+        conn.commit()
+    finally:
+        conn.close()
+    return [row[2] for row in rows]
+
+
+def save_index(db: FAISS, path: str):
+    """Write to a temp dir and rename into place; index.faiss goes last since its
+    mtime is the version running servers watch for."""
+    os.makedirs(path, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=path) as tmp:
+        texts = _write_docstore(db, os.path.join(tmp, DOCSTORE_FILE))
+        BM25Index.build(texts).save(tmp)
+        faiss.write_index(db.index, os.path.join(tmp, INDEX_FILE))
+        for name in [DOCSTORE_FILE] + bm25_files() + [INDEX_FILE]:
+            os.replace(os.path.join(tmp, name), os.path.join(path, name))
+
+    legacy = os.path.join(path, LEGACY_PICKLE_FILE)
+    if os.path.exists(legacy):
+        os.remove(legacy)
\ No newline at end of file
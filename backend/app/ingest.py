@@ -0,0 +1,210 @@
+"""Incremental knowledge-base ingestion.
+
+Parses the header block (Title/Source/Version/Tags) of every ``knowledge_base/*.txt``
+file, chunks and embeds it, and keeps a manifest of per-file content hashes next to
+the FAISS index so only added, changed or deleted files are re-embedded.
+
+    cd backend
+    python -m app.ingest            # incremental
+    python -m app.ingest --full     # rebuild everything
+    python -m app.ingest --index-type hnsw   # see app/ann_index.py for the options
+"""
+import os
+import json
+import hashlib
+import logging
+import argparse
+
+from langchain_community.vectorstores import FAISS
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from .vector_store import VECTOR_STORE_PATH, BASE_DIR, _get_embeddings
+from .index_store import load_index_for_update, save_index, INDEX_FILE
+from .ann_index import INDEX_TYPE, INDEX_TYPES, build_index, supports_removal, describe
+
+logger = logging.getLogger(__name__)
+
+KB_DIR = os.getenv(
+    "KB_DIR",
+    os.path.abspath(os.path.join(BASE_DIR, "..", "knowledge_base"))
+)
+
+MANIFEST_NAME = "manifest.json"
+HEADER_FIELDS = ("title", "source", "version", "tags")
+
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "800"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "120"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+
+def parse_document(text: str):
+    """Split a KB file into (header metadata, body). The header ends at the first blank line."""
+    meta = {}
+    lines = text.splitlines()
+    body_start = 0
+    for i, line in enumerate(lines):
+        if not line.strip():
+            body_start = i + 1
+            break
+        key, sep, value = line.partition(":")
+        if not sep or key.strip().lower() not in HEADER_FIELDS:
+            # no header block, the whole file is body
+            return {}, text
+        meta[key.strip().lower()] = value.strip()
+    else:
+        body_start = len(lines)
+
+    if "tags" in meta:
+        meta["tags"] = [t.strip() for t in meta["tags"].split(",") if t.strip()]
+    return meta, "\n".join(lines[body_start:])
+
+
+def _file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def load_manifest(store_path: str = VECTOR_STORE_PATH) -> dict:
+    path = os.path.join(store_path, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest: dict, store_path: str = VECTOR_STORE_PATH):
+    path = os.path.join(store_path, MANIFEST_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def chunk_file(path: str, name: str, digest: str, splitter):
+    with open(path, encoding="utf8") as f:
+        meta, body = parse_document(f.read())
+
+    texts = splitter.split_text(body)
+    metadatas = []
+    ids = []
+    for i, _ in enumerate(texts):
+        metadatas.append({
+            "source": name,
+            "title": meta.get("title", os.path.splitext(name)[0]),
+            "source_ref": meta.get("source"),
+            "version": meta.get("version"),
+            "tags": meta.get("tags", []),
+            "chunk": i,
+        })
+        ids.append(f"{name}:{digest[:12]}:{i}")
+    return texts, metadatas, ids
+
+
+def _embed_in_batches(texts, batch_size: int):
+    embeddings = _get_embeddings()
+    vectors = []
+    for start in range(0, len(texts), batch_size):
+        vectors.extend(embeddings.embed_documents(texts[start:start + batch_size]))
+    return vectors
+
+
+def _diff(current: dict, files: dict):
+    added = [n for n in current if n not in files]
+    changed = [n for n in current if n in files and files[n]["sha256"] != current[n]]
+    deleted = [n for n in files if n not in current]
+    return added, changed, deleted
+
+
+def ingest(kb_dir: str = KB_DIR, store_path: str = VECTOR_STORE_PATH,
+           full: bool = False, batch_size: int = EMBED_BATCH_SIZE,
+           index_type: str = INDEX_TYPE) -> dict:
+    """Bring the FAISS index at store_path in line with kb_dir. Returns change counts."""
+    index_exists = os.path.exists(os.path.join(store_path, INDEX_FILE))
+    manifest = load_manifest(store_path)
+    files = manifest.get("files", {})
+
+    current = {
+        name: _file_hash(os.path.join(kb_dir, name))
+        for name in sorted(os.listdir(kb_dir))
+        if name.endswith(".txt")
+    }
+    added, changed, deleted = _diff(current, files)
+
+    db = None
+    # a prebuilt index without a manifest can't be diffed, so rebuild it
+    rebuild = full or not index_exists or not files or manifest.get("index_type") != index_type
+    if not rebuild and (changed or deleted):
+        db = load_index_for_update(store_path, _get_embeddings())
+        if not supports_removal(db.index):
+            logger.info("%s index can't remove vectors in place, rebuilding", describe(db.index))
+            rebuild = True
+
+    if rebuild:
+        files = {}
+        added, changed, deleted = _diff(current, files)
+
+    summary = {"added": len(added), "changed": len(changed), "deleted": len(deleted),
+               "unchanged": len(current) - len(added) - len(changed), "chunks": 0,
+               "rebuilt": rebuild}
+
+    if not (added or changed or deleted):
+        logger.info("Knowledge base unchanged, nothing to ingest")
+        return summary
+
+    stale_ids = [cid for name in changed + deleted for cid in files[name]["ids"]]
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    texts, metadatas, ids = [], [], []
+    for name in added + changed:
+        t, m, i = chunk_file(os.path.join(kb_dir, name), name, current[name], splitter)
+        texts.extend(t)
+        metadatas.extend(m)
+        ids.extend(i)
+        files[name] = {"sha256": current[name], "ids": i}
+    summary["chunks"] = len(texts)
+
+    vectors = _embed_in_batches(texts, batch_size)
+    pairs = list(zip(texts, vectors))
+
+    if rebuild:
+        if not pairs:
+            raise ValueError(f"No knowledge base documents found in {kb_dir}")
+        db = FAISS.from_embeddings(pairs, _get_embeddings(), metadatas=metadatas, ids=ids)
+        if index_type != "flat":
+            # same row order, so index_to_docstore_id stays valid
+            db.index = build_index(vectors, index_type)
+    else:
+        if db is None:
+            db = load_index_for_update(store_path, _get_embeddings())
+        if stale_ids:
+            db.delete(stale_ids)
+        if pairs:
+            db.add_embeddings(pairs, metadatas=metadatas, ids=ids)
+
+    for name in deleted:
+        files.pop(name, None)
+
+    save_index(db, store_path)
+    save_manifest({"index_type": index_type, "files": files}, store_path)
+
+    logger.info("Ingestion complete: %s", summary)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or update the FAISS knowledge-base index")
+    parser.add_argument("--kb-dir", default=KB_DIR)
+    parser.add_argument("--store-path", default=VECTOR_STORE_PATH)
+    parser.add_argument("--full", action="store_true", help="re-embed every file")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=INDEX_TYPE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    summary = ingest(args.kb_dir, args.store_path, full=args.full,
+                     batch_size=args.batch_size, index_type=args.index_type)
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
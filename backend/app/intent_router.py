@@ -0,0 +1,125 @@
+"""Embedding-based intent router that runs before retrieval and the LLM.
+
+Each query is embedded with the same bge-small model as retrieval (so the vector is
+reused from the embedding cache by the answer cache and the retriever) and compared
+to labelled exemplars. A class wins when the mean similarity of its INTENT_TOP_K
+nearest exemplars beats "medical" by INTENT_MARGIN and reaches INTENT_MIN_SCORE;
+anything uncertain goes down the normal RAG path.
+"""
+import os
+import json
+import time
+import logging
+import threading
+
+import numpy as np
+
+from .vector_store import _get_embeddings
+from .answer_cache import _depends_on_history
+from .embedding_service import normalise_query
+from .metrics import timed
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() == "true"
+INTENT_EXEMPLARS_PATH = os.getenv(
+    "INTENT_EXEMPLARS_PATH", os.path.join(BASE_DIR, "data", "intent_exemplars.json")
+)
+INTENT_TOP_K = int(os.getenv("INTENT_TOP_K", "3"))
+INTENT_MIN_SCORE = float(os.getenv("INTENT_MIN_SCORE", "0.70"))
+INTENT_MARGIN = float(os.getenv("INTENT_MARGIN", "0.04"))
+
+MEDICAL = "medical"
+NON_MEDICAL = "non_medical"
+EMERGENCY = "emergency"
+SELF_HARM = "self_harm"
+
+
+class IntentRouter:
+    def __init__(self, embeddings, exemplars: dict, top_k: int = INTENT_TOP_K,
+                 min_score: float = INTENT_MIN_SCORE, margin: float = INTENT_MARGIN):
+        if MEDICAL not in exemplars:
+            raise ValueError("Intent exemplars must include a 'medical' class")
+        self.embeddings = embeddings
+        self.labels = list(exemplars)
+        self.top_k = top_k
+        self.min_score = min_score
+        self.margin = margin
+
+        texts, owners = [], []
+        for i, label in enumerate(self.labels):
+            texts.extend(normalise_query(t) for t in exemplars[label])
+            owners.extend([i] * len(exemplars[label]))
+        self._matrix = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+        self._owners = np.asarray(owners)
+        self._medical = self.labels.index(MEDICAL)
+
+        self.counts = {label: 0 for label in self.labels}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, embeddings, path: str = INTENT_EXEMPLARS_PATH, **kwargs):
+        with open(path, encoding="utf-8") as f:
+            return cls(embeddings, json.load(f), **kwargs)
+
+    def scores(self, query: str) -> dict:
+        vector = np.asarray(self.embeddings.embed_query(normalise_query(query)), dtype=np.float32)
+        # embeddings are L2-normalised, so the dot product is the cosine
+        sims = self._matrix @ vector
+        result = {}
+        for i, label in enumerate(self.labels):
+            own = np.sort(sims[self._owners == i])[-self.top_k:]
+            result[label] = float(own.mean())
+        return result
+
+    def classify(self, query: str, history: str = "") -> str:
+        scores = self.scores(query)
+        medical = scores[MEDICAL]
+        best = max(scores, key=scores.get)
+        label = MEDICAL
+        if best != MEDICAL and scores[best] >= self.min_score and scores[best] - medical >= self.margin:
+            label = best
+        # "and what about its causes?" reads as off-topic without the conversation
+        if label == NON_MEDICAL and _depends_on_history(query, history):
+            label = MEDICAL
+        with self._lock:
+            self.counts[label] += 1
+        return label
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": INTENT_ROUTER_ENABLED,
+                "exemplars": len(self._owners),
+                "routed": dict(self.counts),
+            }
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_intent_router() -> IntentRouter:
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                start = time.perf_counter()
+                _router = IntentRouter.from_file(_get_embeddings())
+                logger.info("Intent router ready (%d exemplars) in %.2fs",
+                            len(_router._owners), time.perf_counter() - start)
+    return _router
+
+
+def route(query: str, history: str = "") -> str:
+    """Intent label for query; "medical" when routing is disabled or fails."""
+    if not INTENT_ROUTER_ENABLED:
+        return MEDICAL
+    try:
+        with timed("intent_routing"):
+            return get_intent_router().classify(query, history)
+    except Exception:
+        logger.exception("Intent routing failed")
+        return MEDICAL
@@ -0,0 +1,338 @@
+"""Resilience layer between the RAG chain and the LLM provider.
+
+``LLMGateway`` is a drop-in Runnable around a chat model that adds, per process:
+
+* a token bucket matching the provider's request quota (LLM_RPM, LLM_BURST), waited
+  on before a concurrency slot is taken so a throttled call doesn't hold one
+* a concurrency cap (LLM_MAX_CONCURRENCY); the token and slot waits together are
+  bounded by LLM_QUEUE_TIMEOUT
+* a per-call timeout (LLM_TIMEOUT) and, for streams, a first-token timeout
+* exponential-backoff retries with jitter for timeouts, 429s and 5xx (LLM_MAX_RETRIES)
+* a circuit breaker that fails fast, or falls back to the secondary model, after
+  LLM_BREAKER_THRESHOLD consecutive failures, for LLM_BREAKER_COOLDOWN seconds; then
+  a single probe call decides whether it closes
+* optional hedging (LLM_HEDGE=true): if the primary hasn't answered by its recent p95
+  latency, the same request goes to the secondary model and the first answer wins
+
+Point GROQ_BASE_URL at a local OpenAI-compatible fake to exercise all of this offline.
+"""
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import deque
+
+from langchain_core.language_models import LanguageModelInput
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable
+
+from .metrics import LLM_GATEWAY_EVENTS, LLM_SLOTS_IN_USE
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "10"))
+LLM_RPM = float(os.getenv("LLM_RPM", "30"))
+LLM_BURST = int(os.getenv("LLM_BURST", "10"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_FIRST_TOKEN_TIMEOUT = float(os.getenv("LLM_FIRST_TOKEN_TIMEOUT", "10"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+LLM_HEDGE = os.getenv("LLM_HEDGE", "false").lower() == "true"
+# used until enough latency samples exist to compute a p95
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "3"))
+
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMUnavailableError(RuntimeError):
+    """Raised when the gateway sheds a call instead of sending it to the provider."""
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    if getattr(exc, "status_code", None) in _RETRYABLE_STATUS:
+        return True
+    # provider SDK connection/timeout errors don't share a base class
+    name = type(exc).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+def _backoff(attempt: int) -> float:
+    return LLM_BACKOFF_BASE * (2 ** attempt) * (0.5 + random.random())
+
+
+class TokenBucket:
+    """Request-rate limiter; reserve() returns how long the caller must wait for its token."""
+
+    def __init__(self, rate_per_sec: float, capacity: int):
+        self.rate = rate_per_sec
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float = float("inf")):
+        """Take a token, or take nothing and return None if the wait would exceed max_wait."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._probe_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.cooldown:
+                return False
+            # half-open: one probe at a time, whose result closes or re-opens the breaker;
+            # a probe that never reports (cancelled, or a non-retryable error) is
+            # replaced after another cooldown
+            if self._probe_at is not None and now - self._probe_at < self.cooldown:
+                return False
+            self._probe_at = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.threshold or self._opened_at is not None:
+                if self.state != "open":
+                    LLM_GATEWAY_EVENTS.labels("breaker_open").inc()
+                    logger.warning("LLM circuit breaker opened after %d failures", self._failures)
+                self._opened_at = time.monotonic()
+                self._probe_at = None
+
+
+class LLMGateway(Runnable[LanguageModelInput, BaseMessage]):
+    def __init__(self, primary, secondary=None, hedge: bool = LLM_HEDGE):
+        self.primary = primary
+        self.secondary = secondary
+        self.hedge = hedge and secondary is not None
+        self._async_slots = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        self._sync_slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+        self._bucket = TokenBucket(LLM_RPM / 60, LLM_BURST)
+        self._breaker = CircuitBreaker(LLM_BREAKER_THRESHOLD, LLM_BREAKER_COOLDOWN)
+        self._latencies = deque(maxlen=200)
+
+    # -- model selection -------------------------------------------------
+
+    def _model(self):
+        if self._breaker.allow():
+            return self.primary
+        if self.secondary is not None:
+            LLM_GATEWAY_EVENTS.labels("fallback").inc()
+            return self.secondary
+        LLM_GATEWAY_EVENTS.labels("rejected").inc()
+        raise LLMUnavailableError("LLM circuit breaker is open")
+
+    def _succeeded(self, model, elapsed: float):
+        if model is self.primary:
+            self._breaker.record_success()
+            self._latencies.append(elapsed)
+
+    def _failed(self, model, exc: BaseException):
+        # a malformed request says nothing about provider health
+        if model is self.primary and _is_retryable(exc):
+            self._breaker.record_failure()
+
+    def _hedge_delay(self) -> float:
+        if len(self._latencies) < 20:
+            return LLM_HEDGE_AFTER
+        ordered = sorted(self._latencies)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    # -- sync ------------------------------------------------------------
+
+    def _reserve_token(self) -> float:
+        wait = self._bucket.reserve(max_wait=LLM_QUEUE_TIMEOUT)
+        if wait is None:
+            LLM_GATEWAY_EVENTS.labels("rejected").inc()
+            raise LLMUnavailableError("LLM request quota exhausted")
+        return wait
+
+    def _admit(self):
+        """Wait for a request token, then a concurrency slot, within LLM_QUEUE_TIMEOUT."""
+        wait = self._reserve_token()
+        time.sleep(wait)
+        if not self._sync_slots.acquire(timeout=max(LLM_QUEUE_TIMEOUT - wait, 0)):
+            LLM_GATEWAY_EVENTS.labels("rejected").inc()
+            raise LLMUnavailableError("Too many concurrent LLM calls")
+        LLM_SLOTS_IN_USE.inc()
+
+    @staticmethod
+    def _release(slots):
+        slots.release()
+        LLM_SLOTS_IN_USE.dec()
+
+    def invoke(self, input, config=None, **kwargs):
+        # each attempt is admitted on its own, so a backoff doesn't hold a slot
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            self._admit()
+            try:
+                model = self._model()
+                start = time.perf_counter()
+                try:
+                    result = model.invoke(input, config, **kwargs)
+                except Exception as exc:
+                    self._failed(model, exc)
+                    if attempt == LLM_MAX_RETRIES or not _is_retryable(exc):
+                        raise
+                else:
+                    self._succeeded(model, time.perf_counter() - start)
+                    return result
+            finally:
+                self._release(self._sync_slots)
+            LLM_GATEWAY_EVENTS.labels("retry").inc()
+            time.sleep(_backoff(attempt))
+
+    # -- async -----------------------------------------------------------
+
+    async def _aadmit(self):
+        wait = self._reserve_token()
+        await asyncio.sleep(wait)
+        try:
+            # never a zero timeout: before 3.12 wait_for gives up on a free slot too
+            await asyncio.wait_for(self._async_slots.acquire(), timeout=max(LLM_QUEUE_TIMEOUT - wait, 0.001))
+        except asyncio.TimeoutError:
+            LLM_GATEWAY_EVENTS.labels("rejected").inc()
+            raise LLMUnavailableError("Too many concurrent LLM calls")
+        LLM_SLOTS_IN_USE.inc()
+
+    async def _call(self, model, input, config, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(model.ainvoke(input, config, **kwargs), timeout=LLM_TIMEOUT)
+        except asyncio.CancelledError:
+            raise  # lost a hedge race, not a provider failure
+        except Exception as exc:
+            self._failed(model, exc)
+            raise
+        self._succeeded(model, time.perf_counter() - start)
+        return result
+
+    async def _call_hedged(self, model, input, config, **kwargs):
+        primary = asyncio.ensure_future(self._call(model, input, config, **kwargs))
+        if not self.hedge or model is not self.primary:
+            return await primary
+
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self._hedge_delay())
+            if done:
+                return primary.result()
+
+            LLM_GATEWAY_EVENTS.labels("hedge").inc()
+            tasks.append(asyncio.ensure_future(self._call(self.secondary, input, config, **kwargs)))
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # the losing request, or both if our caller went away
+            for task in tasks:
+                task.cancel()
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            await self._aadmit()
+            try:
+                model = self._model()
+                return await self._call_hedged(model, input, config, **kwargs)
+            except Exception as exc:
+                if attempt == LLM_MAX_RETRIES or not _is_retryable(exc):
+                    raise
+            finally:
+                self._release(self._async_slots)
+            LLM_GATEWAY_EVENTS.labels("retry").inc()
+            await asyncio.sleep(_backoff(attempt))
+
+    async def astream(self, input, config=None, **kwargs):
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            await self._aadmit()
+            try:
+                model = self._model()
+                start = time.perf_counter()
+                stream = model.astream(input, config, **kwargs).__aiter__()
+                try:
+                    # only the wait for the first token is retried; once output has
+                    # reached the client a failure has to surface
+                    first = await asyncio.wait_for(stream.__anext__(), timeout=LLM_FIRST_TOKEN_TIMEOUT)
+                except StopAsyncIteration:
+                    self._succeeded(model, time.perf_counter() - start)
+                    return
+                except Exception as exc:
+                    self._failed(model, exc)
+                    await stream.aclose()
+                    if attempt == LLM_MAX_RETRIES or not _is_retryable(exc):
+                        raise
+                else:
+                    yield first
+                    deadline = start + LLM_TIMEOUT
+                    try:
+                        while True:
+                            try:
+                                chunk = await asyncio.wait_for(
+                                    stream.__anext__(), timeout=max(deadline - time.perf_counter(), 0.001)
+                                )
+                            except StopAsyncIteration:
+                                break
+                            yield chunk
+                    except Exception as exc:
+                        self._failed(model, exc)
+                        raise
+                    finally:
+                        await stream.aclose()
+                    self._succeeded(model, time.perf_counter() - start)
+                    return
+            finally:
+                self._release(self._async_slots)
+            LLM_GATEWAY_EVENTS.labels("retry").inc()
+            await asyncio.sleep(_backoff(attempt))
+
+    def stats(self) -> dict:
+        return {
+            "breaker": self._breaker.state,
+            "hedge_delay_s": round(self._hedge_delay(), 3) if self.hedge else None,
+        }
\ No newline at end of file
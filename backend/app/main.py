@@ -1,34 +1,66 @@
 import os
+import json
+import asyncio
 import uvicorn
 import logging
 from logging.config import dictConfig
 from dotenv import load_dotenv
 import threading
+import hmac
+import hashlib
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
 ENV_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".env"))
 load_dotenv(ENV_PATH)
 
-from fastapi import FastAPI, HTTPException, Header, Depends, Request
+from fastapi import FastAPI, HTTPException, Header, Depends, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse, Response
 from pydantic import BaseModel, field_validator, EmailStr
 
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
-from slowapi.extension import _rate_limit_exceeded_handler
-
-from .auth import signup, login, verify_token
+from .auth import asignup, alogin, verify_token, aensure_user_indexes
+from .passwords import start_pool, stop_pool
+from .rate_limit import create_limiter
+from .compression import CompressionMiddleware
+from .static_assets import HashedStaticFiles, Pages, etag_matches
 from .chat_storage import (
-    start_chat,
-    save_msg,
-    get_chat_history,
-    list_user_chats,
-    set_chat_title
+    astart_chat,
+    aget_chat_history,
+    aget_chat_version,
+    alist_user_chats,
+    adelete_chat,
+    aensure_indexes,
+    amigrate_embedded_messages,
+    aget_unsummarised_messages,
+    aset_chat_summary,
+    CONTEXT_MESSAGES,
+    HISTORY_PAGE_SIZE,
+    CHAT_LIST_PAGE_SIZE,
+    write_behind
+)
+from .chatbot_logic import (
+    aget_chatbot_response,
+    astream_chatbot_response,
+    start_chat_title,
+    await_chat_title,
+    asummarise_history,
+    history_token_budget,
+    ERROR_REPLY,
+    EMERGENCY_REPLY,
+    SELF_HARM_REPLY
+)
+from .intent_router import get_intent_router
+from .safety_filter import get_safety_filter, SELF_HARM, EMERGENCY, ABUSE
+from .metrics import timed, register_state_gauges, render_latest
+from .context_builder import (
+    build_history,
+    summary_batch,
+    SUMMARY_KEEP_RECENT,
+    SUMMARY_MIN_BATCH,
+    SUMMARY_MAX_BATCH,
 )
-from .chatbot_logic import get_chatbot_response, generate_chat_title
-from .db import chats, client
+from .vector_store import _get_embeddings, get_index_manager
+from .db import async_client
 
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 
@@ -74,10 +106,8 @@ logger = logging.getLogger("medibot")
 app = FastAPI(title="MediBot API", version="1.0.0")
 
 
-limiter = Limiter(key_func=get_remote_address)
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-app.add_middleware(SlowAPIMiddleware)
+# keyed by user_id (or client IP), shared across workers via RATE_LIMIT_STORAGE_URI
+limiter = create_limiter()
 
 app.add_middleware(
     CORSMiddleware,
@@ -93,51 +123,120 @@ app.add_middleware(
     allow_headers=["Authorization", "Content-Type"],
 )
 
+# gzip/brotli above COMPRESS_MIN_SIZE; SSE streams pass through untouched
+app.add_middleware(CompressionMiddleware)
+
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 FRONTEND_DIR = os.path.join(BASE_DIR, "frontend")
 static_dir = os.path.join(FRONTEND_DIR, "static")
 
-if os.path.exists(static_dir):
-    app.mount("/static", StaticFiles(directory=static_dir), name="static")
+static_files = HashedStaticFiles(static_dir) if os.path.exists(static_dir) else None
+if static_files is not None:
+    app.mount("/static", static_files, name="static")
+
+pages = Pages(FRONTEND_DIR, static_files)
+
+
+
+# one-off: set for a single start after upgrading from chats that embed their messages;
+# otherwise every worker start would scan the chats collection for them
+MIGRATE_EMBEDDED_MESSAGES = os.getenv("MIGRATE_EMBEDDED_MESSAGES", "false").lower() == "true"
+
+
+@app.on_event("startup")
+async def init_storage():
+    await aensure_indexes()
+    await aensure_user_indexes()
+    if MIGRATE_EMBEDDED_MESSAGES:
+        migrated = await amigrate_embedded_messages()
+        logger.info("Moved embedded messages of %d chats to the messages collection", migrated)
+    write_behind.start()
+
+
+@app.on_event("shutdown")
+async def flush_storage():
+    await write_behind.stop()
+
+
+@app.on_event("startup")
+async def start_password_pool():
+    await asyncio.to_thread(start_pool)
+
+
+@app.on_event("shutdown")
+def stop_password_pool():
+    stop_pool()
+
 
+@app.on_event("startup")
+def load_safety_filter():
+    # a malformed pattern file should stop startup, not the first chat
+    get_safety_filter()
+
+
+# set once the embedding model, index, chain and intent router are loaded; /api/ready
+# reports it so the platform only routes traffic to a warm instance
+_ready = threading.Event()
 
 
 @app.on_event("startup")
 def preload_rag():
-    from app.chatbot_logic import _get_chain
-    threading.Thread(target=_get_chain).start()
+    from .chatbot_logic import _get_chain
+
+    def load():
+        try:
+            with timed("warm_up"):
+                _get_chain()
+                get_intent_router()
+                # the first forward pass allocates the model's buffers
+                _get_embeddings().embed_query("warm up")
+            # a worker forked from a long-lived master may find a newer index on disk
+            get_index_manager().reload()
+            get_index_manager().start_watching()
+            _ready.set()
+            logger.info("MediBot is ready")
+        except Exception:
+            logger.exception("Warm-up failed, /api/ready will keep reporting not ready")
+
+    threading.Thread(target=load, name="warm-up", daemon=True).start()
 
 @app.get("/", include_in_schema=False)
-async def read_index():
-    return FileResponse(os.path.join(FRONTEND_DIR, "index.html"))
+async def read_index(request: Request):
+    return pages.response(request, "index.html")
 
 @app.get("/login", include_in_schema=False)
-async def read_login():
-    return FileResponse(os.path.join(FRONTEND_DIR, "login_page.html"))
+async def read_login(request: Request):
+    return pages.response(request, "login_page.html")
 
 @app.get("/signup", include_in_schema=False)
-async def read_signup():
-    return FileResponse(os.path.join(FRONTEND_DIR, "signup.html"))
+async def read_signup(request: Request):
+    return pages.response(request, "signup.html")
 
 @app.get("/chat", include_in_schema=False)
-async def read_chat():
-    return FileResponse(os.path.join(FRONTEND_DIR, "chat.html"))
-
-BLOCKED_PATTERNS = [
-    "i want to kill myself",
-    "i want to end my life",
-    "i am going to kill myself",
-    "how to commit suicide",
-    "how to hurt myself",
-    "how to cut myself",
-]
-
-def is_safe_message(message: str) -> bool:
-    msg = message.lower()
-    for pattern in BLOCKED_PATTERNS:
-        if pattern in msg:
-            return False
-    return True
+async def read_chat(request: Request):
+    return pages.response(request, "chat.html")
+
+SAFETY_REPLY = "Please consult a medical professional or a mental health helpline for serious concerns."
+
+ABUSE_REPLY = (
+    "I can't help with that. If you or someone else is in danger, "
+    "please contact local emergency services."
+)
+
+SAFETY_REPLIES = {
+    SELF_HARM: SELF_HARM_REPLY,
+    EMERGENCY: EMERGENCY_REPLY,
+    ABUSE: ABUSE_REPLY,
+}
+
+def safety_reply(message: str):
+    """Canned reply if message matches a safety phrase, else None."""
+    with timed("safety_filter"):
+        category = get_safety_filter().categorise(message)
+    if category is None:
+        return None
+    logger.info("Safety filter matched category=%s", category)
+    return SAFETY_REPLIES.get(category, SAFETY_REPLY)
 
 
 class SignupRequest(BaseModel):
@@ -187,13 +286,59 @@ class ChatRequest(BaseModel):
         return v
 
 
-def get_current_user(authorization: str = Header(None)):
+def format_history(chat_doc: dict, question: str) -> str:
+    return build_history(
+        chat_doc.get("messages", []),
+        chat_doc.get("summary"),
+        history_token_budget(question)
+    )
+
+
+_summary_tasks = {}
+
+
+async def refresh_summary(chat_id: str):
+    try:
+        if write_behind.has_pending(chat_id):
+            await write_behind.flush()
+        # a long backlog (e.g. a migrated legacy chat) is folded in over several rounds;
+        # the cursor only moves past messages that actually went into the summary
+        while True:
+            summary, pending = await aget_unsummarised_messages(
+                chat_id, SUMMARY_KEEP_RECENT, SUMMARY_MAX_BATCH
+            )
+            if len(pending) < SUMMARY_MIN_BATCH:
+                return
+            batch = summary_batch(pending)
+            summary = await asummarise_history(summary, batch)
+            await aset_chat_summary(chat_id, summary, batch[-1]["_id"])
+            logger.info("Rolling summary updated chat_id=%s folded=%d", chat_id, len(batch))
+    except Exception:
+        logger.exception("Rolling summary update failed chat_id=%s", chat_id)
+
+
+def schedule_summary_refresh(chat_doc: dict):
+    # only chats that have outgrown the verbatim window have anything to fold in
+    chat_id = chat_doc["chat_id"]
+    if len(chat_doc.get("messages", [])) < CONTEXT_MESSAGES or chat_id in _summary_tasks:
+        return
+    task = asyncio.create_task(refresh_summary(chat_id))
+    _summary_tasks[chat_id] = task
+    task.add_done_callback(lambda _: _summary_tasks.pop(chat_id, None))
+
+
+def sse_event(payload: dict) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+async def get_current_user(authorization: str = Header(None)):
     if not authorization:
         raise HTTPException(status_code=401, detail="Unauthorized")
     parts = authorization.split()
     if len(parts) != 2 or parts[0].lower() != "bearer":
         raise HTTPException(status_code=401, detail="Unauthorized")
-    payload = verify_token(parts[1])
+    with timed("verify_token"):
+        payload = verify_token(parts[1])
     if not payload:
         raise HTTPException(status_code=401, detail="Unauthorized")
     return payload
@@ -201,54 +346,49 @@ def get_current_user(authorization: str = Header(None)):
 
 @app.post("/api/signup")
 @limiter.limit("5/minute")
-def register(request: Request, req: SignupRequest):
+async def register(request: Request, req: SignupRequest):
     logger.info("Signup attempt email=%s", req.email)
-    return signup(req.name, req.email, req.password)
+    return await asignup(req.name, req.email, req.password)
 
 
 @app.post("/api/login")
 @limiter.limit("5/minute")
-def user_login(request: Request, req: LoginRequest):
+async def user_login(request: Request, req: LoginRequest):
     logger.info("Login attempt email=%s", req.email)
-    return login(req.email, req.password)
+    return await alogin(req.email, req.password)
 
 
 @app.post("/api/new_chat")
-def new_chat(current_user: dict = Depends(get_current_user)):
+async def new_chat(current_user: dict = Depends(get_current_user)):
     user_id = current_user["user_id"]
-    chat_id = start_chat(user_id)
+    chat_id = await astart_chat(user_id)
     logger.info("New chat created chat_id=%s user_id=%s", chat_id, user_id)
     return {"chat_id": chat_id}
 
 
 @app.post("/api/chat")
-@limiter.limit("10/minute")
-def chat(request: Request, req: ChatRequest, current_user: dict = Depends(get_current_user)):
+@limiter.limit("10/minute", scope="chat")
+async def chat(request: Request, req: ChatRequest, current_user: dict = Depends(get_current_user)):
     user_id = current_user["user_id"]
 
-    if not is_safe_message(req.message):
-        return {"response": "Please consult a medical professional or a mental health helpline for serious concerns."}
+    refusal = safety_reply(req.message)
+    if refusal is not None:
+        return {"response": refusal}
 
-    chat_doc = get_chat_history(req.conversation_id, user_id)
+    with timed("get_chat_history"):
+        chat_doc = await aget_chat_history(req.conversation_id, user_id, limit=CONTEXT_MESSAGES)
 
     if not chat_doc:
         raise HTTPException(status_code=404, detail="Chat not found")
 
-    if not chat_doc.get("title"):
-        title = generate_chat_title(req.message)
-        set_chat_title(req.conversation_id, title)
-    else:
-        title = chat_doc["title"]
+    title = chat_doc.get("title")
+    # first turn: generate the title alongside the answer instead of before it
+    title_task = start_chat_title(req.message) if not title else None
 
-    history = chat_doc.get("messages", [])[-10:]
-    formatted_history = "\n".join(
-        f"{m['role']}: {m['content']}" for m in history
-    )
-
-    save_msg(req.conversation_id, "user", req.message)
+    formatted_history = format_history(chat_doc, req.message)
 
     try:
-        response = get_chatbot_response(
+        response = await aget_chatbot_response(
             req.conversation_id,
             req.message,
             formatted_history
@@ -257,9 +397,18 @@ def chat(request: Request, req: ChatRequest, current_user: dict = Depends(get_cu
             response = str(response)
     except Exception:
         logger.exception("LLM call failed conversation_id=%s", req.conversation_id)
+        if title_task:
+            title_task.cancel()
+        write_behind.record_turn(req.conversation_id, req.message)
         raise HTTPException(status_code=500, detail="Failed to generate response")
 
-    save_msg(req.conversation_id, "assistant", response)
+    new_title = None
+    if title_task:
+        title = new_title = await await_chat_title(title_task, req.message)
+
+    write_behind.record_turn(req.conversation_id, req.message, response, title=new_title)
+    await write_behind.flush_for_reply()
+    schedule_summary_refresh(chat_doc)
 
     logger.info(
         "Chat response sent conversation_id=%s user_id=%s",
@@ -274,35 +423,204 @@ def chat(request: Request, req: ChatRequest, current_user: dict = Depends(get_cu
     }
 
 
+@app.post("/api/chat/stream")
+@limiter.limit("10/minute", scope="chat")
+async def chat_stream(request: Request, req: ChatRequest, current_user: dict = Depends(get_current_user)):
+    user_id = current_user["user_id"]
+
+    refusal = safety_reply(req.message)
+    if refusal is not None:
+        async def refuse():
+            yield sse_event({"type": "token", "content": refusal})
+            yield sse_event({"type": "done"})
+        return StreamingResponse(refuse(), media_type="text/event-stream")
+
+    with timed("get_chat_history"):
+        chat_doc = await aget_chat_history(req.conversation_id, user_id, limit=CONTEXT_MESSAGES)
+
+    if not chat_doc:
+        raise HTTPException(status_code=404, detail="Chat not found")
+
+    title = chat_doc.get("title")
+    title_task = start_chat_title(req.message) if not title else None
+
+    formatted_history = format_history(chat_doc, req.message)
+
+    async def event_stream():
+        yield sse_event({"type": "meta", "chat_id": req.conversation_id, "title": title})
+
+        parts = []
+        title_sent = False
+        recorded = False
+        try:
+            try:
+                async for token in astream_chatbot_response(
+                    req.conversation_id,
+                    req.message,
+                    formatted_history
+                ):
+                    parts.append(token)
+                    yield sse_event({"type": "token", "content": token})
+                    if title_task and not title_sent and title_task.done():
+                        title_sent = True
+                        yield sse_event({"type": "title", "title": title_task.result()})
+            except Exception:
+                logger.exception("LLM stream failed conversation_id=%s", req.conversation_id)
+                parts = [ERROR_REPLY]
+                yield sse_event({"type": "error", "content": ERROR_REPLY})
+
+            new_title = await await_chat_title(title_task, req.message) if title_task else None
+            write_behind.record_turn(req.conversation_id, req.message, "".join(parts), title=new_title)
+            recorded = True
+            # the page reloads the chat list on "done", possibly from another worker
+            await write_behind.flush_for_reply()
+            schedule_summary_refresh(chat_doc)
+
+            if new_title and not title_sent:
+                yield sse_event({"type": "title", "title": new_title})
+
+            logger.info(
+                "Chat stream completed conversation_id=%s user_id=%s",
+                req.conversation_id,
+                user_id
+            )
+            yield sse_event({"type": "done"})
+        finally:
+            if not recorded:
+                # client disconnected mid-stream; keep whatever was generated
+                if title_task:
+                    title_task.cancel()
+                write_behind.record_turn(req.conversation_id, req.message, "".join(parts) or None)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get("/api/chat_list")
-def get_chat_list(current_user: dict = Depends(get_current_user)):
-    return list_user_chats(current_user["user_id"])
+async def get_chat_list(
+    cursor: str = None,
+    limit: int = Query(CHAT_LIST_PAGE_SIZE, ge=1, le=100),
+    current_user: dict = Depends(get_current_user)
+):
+    return await alist_user_chats(current_user["user_id"], limit=limit, cursor=cursor)
+
+
+def _history_etag(chat_id: str, version: dict, before: str, limit: int) -> str:
+    # a page only changes when the chat is written to or its summary is rolled forward
+    raw = f"{chat_id}|{version['updated_at'].isoformat()}|{version.get('summary_upto')}|{before}|{limit}"
+    return f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:20]}"'
+
+
+def _not_modified(request: Request, etag: str, last_modified) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return since.tzinfo is not None and last_modified.replace(microsecond=0) <= since
 
 
 @app.get("/api/chat_history/{chat_id}")
-def api_chat_history(chat_id: str, current_user: dict = Depends(get_current_user)):
+async def api_chat_history(
+    request: Request,
+    response: Response,
+    chat_id: str,
+    before: str = None,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=200),
+    current_user: dict = Depends(get_current_user)
+):
     user_id = current_user["user_id"]
-    chat_doc = get_chat_history(chat_id, user_id)
+
+    # cheap covered lookup first, so an unchanged chat is answered without loading messages
+    version = await aget_chat_version(chat_id, user_id)
+    if not version:
+        raise HTTPException(status_code=404, detail="Chat not found")
+
+    last_modified = version["updated_at"].replace(tzinfo=timezone.utc)
+    headers = {
+        "ETag": _history_etag(chat_id, version, before, limit),
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+    if _not_modified(request, headers["ETag"], last_modified):
+        return Response(status_code=304, headers=headers)
+
+    chat_doc = await aget_chat_history(chat_id, user_id, limit=limit, before=before)
     if not chat_doc:
         raise HTTPException(status_code=404, detail="Chat not found")
+    response.headers.update(headers)
     return chat_doc
 
 
 @app.delete("/api/delete_chat/{chat_id}")
-def delete_chat(chat_id: str, current_user: dict = Depends(get_current_user)):
-    result = chats.delete_one({
-        "chat_id": chat_id,
-        "user_id": current_user["user_id"]
-    })
-    if result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Chat not found")
+async def delete_chat(chat_id: str, current_user: dict = Depends(get_current_user)):
+    await adelete_chat(chat_id, current_user["user_id"])
     return {"status": "success", "message": "Chat deleted successfully"}
 
 
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def require_admin(x_admin_token: str = Header(None)):
+    # constant-time, so response timing doesn't reveal how much of a guess matched
+    if not ADMIN_TOKEN or not x_admin_token or not hmac.compare_digest(
+        x_admin_token.encode(), ADMIN_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+@app.post("/api/admin/reload_index", dependencies=[Depends(require_admin)])
+async def reload_index():
+    manager = get_index_manager()
+    manager.reload_in_background()
+    return {"status": "reloading", "current_version": manager.version}
+
+
+register_state_gauges()
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_latest()
+    return Response(body, media_type=content_type)
+
+
+@app.get("/api/stats", dependencies=[Depends(require_admin)])
+async def service_stats():
+    # only what this worker has already loaded; a stats call never loads a model
+    from . import answer_cache, chatbot_logic, intent_router, retrieval_cache, vector_store
+
+    loaded = {
+        "answer_cache": answer_cache._cache,
+        "embeddings": vector_store._embeddings,
+        "retrieval_cache": retrieval_cache._cache,
+        "llm": chatbot_logic._llm,
+        "intents": intent_router._router,
+    }
+    stats = {name: component.stats() for name, component in loaded.items() if component is not None}
+    stats["rate_limit"] = limiter.stats()
+    return stats
+
+
+@app.get("/api/ready")
+async def readiness_check():
+    if not _ready.is_set():
+        raise HTTPException(status_code=503, detail="Warming up")
+    return {"status": "ready"}
+
+
 @app.get("/api/health")
-def health_check():
+async def health_check():
     try:
-        client.admin.command("ping")
+        await async_client.admin.command("ping")
         return {"status": "ok", "db": "connected"}
     except Exception:
         logger.exception("Database health check failed")
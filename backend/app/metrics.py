@@ -0,0 +1,224 @@
+"""Prometheus metrics for the /api/chat path.
+
+Stage timings are recorded with ``timed("stage")``; LLM first-token/total latency and
+token counts come from ``LLMMetricsCallback`` attached to the chat model. Cache and
+index gauges are read lazily at scrape time. Pool gauges (LLM slots, the bcrypt
+queue, Mongo connections) are moved by the pools themselves as they change.
+
+Under pre-fork serving (gunicorn.conf.py) PROMETHEUS_MULTIPROC_DIR is set and a
+scrape aggregates the counters, histograms and pool gauges of all live workers; the
+state gauges describe a single process, so they are only exposed per worker via the
+admin-only /api/stats.
+"""
+import os
+import time
+import threading
+
+from langchain_core.callbacks import BaseCallbackHandler
+from pymongo.monitoring import ConnectionPoolListener
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+)
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+STAGE_LATENCY = Histogram(
+    "medibot_stage_seconds",
+    "Latency of each stage of a chat request",
+    ["stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+LLM_TOKENS = Counter(
+    "medibot_llm_tokens_total",
+    "Tokens consumed by LLM calls",
+    ["kind"],
+)
+
+LLM_CALL_TOKENS = Histogram(
+    "medibot_llm_call_tokens",
+    "Tokens of a single LLM call",
+    ["kind"],
+    buckets=(16, 64, 128, 256, 512, 1024, 2048, 4096, 8192),
+)
+
+LLM_CALLS = Counter(
+    "medibot_llm_calls_total",
+    "LLM calls by outcome",
+    ["outcome"],
+)
+
+LLM_GATEWAY_EVENTS = Counter(
+    "medibot_llm_gateway_events_total",
+    "Retries, hedges, fallbacks and shed calls in the LLM gateway",
+    ["event"],
+)
+
+
+# livesum: a worker's share drops out of the total when it exits
+LLM_SLOTS_IN_USE = Gauge(
+    "medibot_llm_slots_in_use",
+    "LLM gateway concurrency slots held by calls",
+    multiprocess_mode="livesum",
+)
+
+PASSWORD_HASH_PENDING = Gauge(
+    "medibot_password_hash_pending",
+    "bcrypt calls queued or running on the password pool",
+    multiprocess_mode="livesum",
+)
+
+MONGO_CONNECTIONS = Gauge(
+    "medibot_mongo_connections",
+    "Mongo pool connections, open and checked out",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+
+
+def timed(stage: str):
+    """Context manager that records the block's wall time under stage."""
+    return STAGE_LATENCY.labels(stage).time()
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """Records first-token latency, total latency and token usage of every LLM call."""
+
+    def __init__(self):
+        self._starts = {}
+        self._first_token_seen = set()
+        self._lock = threading.Lock()
+
+    def _start(self, run_id):
+        with self._lock:
+            self._starts[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        with self._lock:
+            if run_id in self._first_token_seen or run_id not in self._starts:
+                return
+            self._first_token_seen.add(run_id)
+            started = self._starts[run_id]
+        STAGE_LATENCY.labels("llm_first_token").observe(time.perf_counter() - started)
+
+    def _finish(self, run_id):
+        with self._lock:
+            started = self._starts.pop(run_id, None)
+            self._first_token_seen.discard(run_id)
+        if started is not None:
+            STAGE_LATENCY.labels("llm_total").observe(time.perf_counter() - started)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._finish(run_id)
+        LLM_CALLS.labels("ok").inc()
+
+        usage = None
+        for generations in response.generations:
+            for gen in generations:
+                message = getattr(gen, "message", None)
+                if getattr(message, "usage_metadata", None):
+                    usage = message.usage_metadata
+        if usage:
+            tokens = {"prompt": usage.get("input_tokens", 0), "completion": usage.get("output_tokens", 0)}
+        elif response.llm_output and response.llm_output.get("token_usage"):
+            token_usage = response.llm_output["token_usage"]
+            tokens = {
+                "prompt": token_usage.get("prompt_tokens", 0),
+                "completion": token_usage.get("completion_tokens", 0),
+            }
+        else:
+            return
+        for kind, count in tokens.items():
+            LLM_TOKENS.labels(kind).inc(count)
+            LLM_CALL_TOKENS.labels(kind).observe(count)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+        LLM_CALLS.labels("error").inc()
+
+
+class MongoPoolMetrics(ConnectionPoolListener):
+    """pymongo pool listener behind MONGO_CONNECTIONS; pass it in a client's event_listeners."""
+
+    def connection_created(self, event):
+        MONGO_CONNECTIONS.labels("open").inc()
+
+    def connection_closed(self, event):
+        MONGO_CONNECTIONS.labels("open").dec()
+
+    def connection_checked_out(self, event):
+        MONGO_CONNECTIONS.labels("in_use").inc()
+
+    def connection_checked_in(self, event):
+        MONGO_CONNECTIONS.labels("in_use").dec()
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        pass
+
+
+def register_state_gauges():
+    """Expose cache and index state as gauges read at scrape time."""
+    if MULTIPROCESS:
+        return
+
+    from . import vector_store
+    from .answer_cache import get_answer_cache
+
+    def answer_cache_stat(key):
+        return lambda: get_answer_cache().stats()[key]
+
+    def embedding_stat(key):
+        # don't load the model just to answer a scrape
+        return lambda: vector_store._embeddings.stats()[key] if vector_store._embeddings else 0
+
+    def index_refs():
+        manager = vector_store._index_manager
+        return manager._current.refs if manager else 0
+
+    gauges = [
+        ("medibot_answer_cache_entries", "Entries in the semantic answer cache", answer_cache_stat("entries")),
+        ("medibot_answer_cache_hits", "Answer cache hits since start", answer_cache_stat("hits")),
+        ("medibot_answer_cache_misses", "Answer cache misses since start", answer_cache_stat("misses")),
+        ("medibot_embedding_cache_entries", "Entries in the query embedding cache", embedding_stat("cache_entries")),
+        ("medibot_embedding_cache_hits", "Query embedding cache hits since start", embedding_stat("cache_hits")),
+        ("medibot_embedding_avg_batch_size", "Mean micro-batch size of query embeddings", embedding_stat("avg_batch_size")),
+        ("medibot_index_inflight_searches", "Searches holding the current index", index_refs),
+    ]
+    for name, doc, fn in gauges:
+        Gauge(name, doc).set_function(fn)
+
+
+def render_latest():
+    """Body and content type for /metrics, merged across workers in multiprocess mode."""
+    if not MULTIPROCESS:
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+    from prometheus_client import multiprocess
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
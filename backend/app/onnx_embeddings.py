@@ -0,0 +1,118 @@
+"""bge-small embeddings on ONNX Runtime, without torch or sentence-transformers.
+
+The model is BAAI's own ONNX export of bge-small-en-v1.5 with int8 dynamic
+quantisation applied once at build time. At runtime only ``onnxruntime``,
+``tokenizers`` and numpy are imported, which is most of the cold-start win.
+Vectors are CLS-pooled and L2-normalised like the sentence-transformers model; the
+quantised model is close but not identical, so build the index with the backend
+you serve with.
+
+    cd backend
+    python -m app.onnx_embeddings                  # writes EMBED_ONNX_PATH
+    python -m app.onnx_embeddings --no-quantize
+"""
+import os
+import shutil
+import logging
+import argparse
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+EMBED_MODEL_REPO = "BAAI/bge-small-en-v1.5"
+EMBED_ONNX_PATH = os.getenv(
+    "EMBED_ONNX_PATH", os.path.abspath(os.path.join(BASE_DIR, "..", "onnx_model"))
+)
+EMBED_ONNX_THREADS = int(os.getenv("EMBED_ONNX_THREADS", "0"))  # 0 = onnxruntime default
+MAX_SEQ_LENGTH = 512
+
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model_quantized.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+
+class OnnxEmbeddings(Embeddings):
+    def __init__(self, model_dir: str = EMBED_ONNX_PATH, threads: int = EMBED_ONNX_THREADS):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = os.path.join(model_dir, QUANTIZED_MODEL_FILE)
+        if not os.path.exists(model_path):
+            model_path = os.path.join(model_dir, MODEL_FILE)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"No ONNX model in {model_dir}, run `python -m app.onnx_embeddings` first"
+            )
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        logger.info("Loaded ONNX embedding model %s", model_path)
+
+    def _embed(self, texts):
+        if not texts:
+            return []
+        encodings = self.tokenizer.encode_batch(list(texts))
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        feeds = {
+            "input_ids": input_ids,
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+        }
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        hidden = self.session.run(None, feeds)[0]
+        cls = hidden[:, 0]
+        cls = cls / np.linalg.norm(cls, axis=1, keepdims=True)
+        return cls.tolist()
+
+    def embed_documents(self, texts):
+        return self._embed(texts)
+
+    def embed_query(self, text):
+        return self._embed([text])[0]
+
+
+def export_model(out_dir: str = EMBED_ONNX_PATH, quantize: bool = True) -> str:
+    """Fetch the ONNX export and tokenizer from the Hub and int8-quantise the weights."""
+    from huggingface_hub import hf_hub_download
+
+    os.makedirs(out_dir, exist_ok=True)
+    shutil.copy(hf_hub_download(EMBED_MODEL_REPO, TOKENIZER_FILE), os.path.join(out_dir, TOKENIZER_FILE))
+    model_path = os.path.join(out_dir, MODEL_FILE)
+    shutil.copy(hf_hub_download(EMBED_MODEL_REPO, f"onnx/{MODEL_FILE}"), model_path)
+
+    if not quantize:
+        return model_path
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantized_path = os.path.join(out_dir, QUANTIZED_MODEL_FILE)
+    quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+    logger.info("Quantised %s -> %s (%.1f MB -> %.1f MB)", model_path, quantized_path,
+                os.path.getsize(model_path) / 1e6, os.path.getsize(quantized_path) / 1e6)
+    return quantized_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export bge-small to a quantised ONNX model")
+    parser.add_argument("--out", default=EMBED_ONNX_PATH)
+    parser.add_argument("--no-quantize", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(export_model(args.out, quantize=not args.no_quantize))
+
+
+if __name__ == "__main__":
+    main()
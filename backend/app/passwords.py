@@ -0,0 +1,110 @@
+"""bcrypt hashing on a dedicated, size-bounded process pool.
+
+bcrypt is ~250ms of CPU per call at cost 12. Running it in the request threadpool
+lets a burst of logins occupy the threads (and cores) /api/chat needs, so hashes run
+in PASSWORD_HASH_WORKERS separate processes instead. At most PASSWORD_HASH_MAX_PENDING
+calls may be queued or running; beyond that callers get a 503 straight away rather
+than piling up behind the pool.
+"""
+import os
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 8)))
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
+
+
+def _hash(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _check(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+
+def _noop():
+    return None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn, not fork: the server process has threads (warm-up, write-behind,
+                # Mongo monitors) that must not be copied mid-flight
+                _pool = ProcessPoolExecutor(
+                    max_workers=PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+
+def start_pool():
+    """Spawn the workers now so the first login after a deploy doesn't pay for it."""
+    pool = _get_pool()
+    for future in [pool.submit(_noop) for _ in range(PASSWORD_HASH_WORKERS)]:
+        future.result()
+    logger.info("Password hashing pool started with %d workers", PASSWORD_HASH_WORKERS)
+
+
+def stop_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _submit(fn, *args):
+    # imported here, not at the top: the spawned hash workers import this module too
+    from .metrics import PASSWORD_HASH_PENDING
+
+    if not _slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=503,
+            detail="Too many sign-ins in progress, please try again shortly",
+            headers={"Retry-After": "1"},
+        )
+    PASSWORD_HASH_PENDING.inc()
+
+    def release(_=None):
+        _slots.release()
+        PASSWORD_HASH_PENDING.dec()
+
+    try:
+        future = _get_pool().submit(fn, *args)
+    except Exception:
+        release()
+        raise
+    future.add_done_callback(release)
+    return future
+
+
+async def ahash_password(password: str) -> str:
+    return (await asyncio.wrap_future(_submit(_hash, password.encode(), BCRYPT_ROUNDS))).decode()
+
+
+async def acheck_password(password: str, hashed: str) -> bool:
+    return await asyncio.wrap_future(_submit(_check, password.encode(), hashed.encode()))
+
+
+def needs_rehash(hashed: str) -> bool:
+    """True if hashed was made with a different cost than BCRYPT_ROUNDS."""
+    try:
+        return int(hashed.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
@@ -0,0 +1,116 @@
+"""
+Pre-fork serving support, used by backend/gunicorn.conf.py.
+
+The gunicorn master calls preload() before forking any worker. It loads the
+embedding model, the FAISS index (mmap'd) with its BM25 postings, the intent
+router and the safety automaton once, and every worker shares them copy-on-write.
+preload() opens no sockets and starts no threads. Its docstore connection stays in
+the master; each worker opens its own on first use, and one forked after an ingest
+reloads the index during warm-up. Mongo clients, the LLM gateway, the embedding
+batcher and the bcrypt pool are all created in the worker once the app is
+imported, which happens after fork.
+"""
+import gc
+import os
+import sys
+import math
+import time
+import signal
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# one compute thread per worker: N workers already keep N cores busy, and thread
+# pools started in the master (OpenMP, onnxruntime, tokenizers) do not survive fork
+THREAD_DEFAULTS = {
+    "OMP_NUM_THREADS": "1",
+    "MKL_NUM_THREADS": "1",
+    "EMBED_ONNX_THREADS": "1",
+    "TOKENIZERS_PARALLELISM": "false",
+}
+
+# budgets each process enforces on its own; split so the fleet total stays as configured
+# (defaults mirror llm_gateway.py and passwords.py)
+PER_PROCESS_BUDGETS = {
+    "LLM_RPM": "30",
+    "LLM_BURST": "10",
+    "LLM_MAX_CONCURRENCY": "32",
+    "PASSWORD_HASH_WORKERS": str(max(1, (os.cpu_count() or 2) // 2)),
+}
+
+
+def configure_environment(workers: int):
+    """Set per-worker env defaults; must run before the app package is imported."""
+    for name, value in THREAD_DEFAULTS.items():
+        os.environ.setdefault(name, value)
+
+    for name, default in PER_PROCESS_BUDGETS.items():
+        total = float(os.getenv(name, default))
+        share = total / workers if name == "LLM_RPM" else max(1, math.ceil(total / workers))
+        os.environ[name] = str(share)
+
+    if workers > 1:
+        # a turn buffered in one worker is invisible to the others until flushed
+        os.environ.setdefault("WRITE_BEHIND_SYNC_REPLIES", "true")
+
+        rate_limited = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+        if rate_limited and os.getenv("RATE_LIMIT_STORAGE_URI", "memory://").startswith("memory://"):
+            raise RuntimeError(
+                f"{workers} workers need a shared RATE_LIMIT_STORAGE_URI (e.g. redis://); with the "
+                "in-memory store each worker would enforce its own limits"
+            )
+
+
+def preload() -> float:
+    """Load the read-only model and index state into the master before fork; returns seconds taken."""
+    from .vector_store import _get_embeddings, get_index_manager
+    from .intent_router import get_intent_router
+    from .safety_filter import get_safety_filter
+
+    start = time.perf_counter()
+    _get_embeddings()
+    get_index_manager()
+    get_intent_router()
+    get_safety_filter()
+
+    if f"{__package__}.db" in sys.modules:
+        logger.warning("Mongo clients were created before fork; workers will inherit them")
+
+    # move everything loaded so far out of the collector's reach, so a worker's gc
+    # passes don't write to (and un-share) the pages holding these objects
+    gc.collect()
+    gc.freeze()
+    return time.perf_counter() - start
+
+
+def private_mb(pid: str = "self") -> float:
+    """Private (unshared) resident memory of a process, from /proc (Linux)."""
+    total = 0
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                total += int(line.split()[1])
+    return total / 1024
+
+
+def start_memory_watchdog(limit_mb: float, interval: float = 30.0):
+    """Gracefully stop this worker once its private memory exceeds limit_mb.
+
+    Shared pages are not counted, so the preloaded model doesn't trip the limit.
+    gunicorn forks a replacement, which starts with the shared state already loaded.
+    """
+    if limit_mb <= 0 or not os.path.exists("/proc/self/smaps_rollup"):
+        return
+
+    def watch():
+        while True:
+            time.sleep(interval)
+            used = private_mb()
+            if used > limit_mb:
+                logger.warning("Worker %d private memory %.0fMB > %.0fMB, recycling",
+                               os.getpid(), used, limit_mb)
+                os.kill(os.getpid(), signal.SIGTERM)
+                return
+
+    threading.Thread(target=watch, name="memory-watchdog", daemon=True).start()
@@ -0,0 +1,220 @@
+"""Rate limiting shared across workers and instances.
+
+Limits are token buckets (capacity = the count in "10/minute", refilled evenly over
+the period) kept in a pluggable store: in-process memory for a single worker and
+tests, or anything speaking the Redis protocol (RATE_LIMIT_STORAGE_URI=redis://...)
+where a Lua script makes check-and-take atomic.
+
+To avoid a round trip on every request, a process leases a slice of a bucket
+(RATE_LIMIT_LEASE_FRACTION of its capacity) and spends it locally; only when the
+lease is used up or expires does it go back to the store. Leased tokens are already
+taken from the shared bucket, so the global limit still holds.
+
+Clients are keyed by user_id when authenticated, otherwise by IP address, read from
+X-Forwarded-For when TRUSTED_PROXY_HOPS proxies sit in front of the app.
+"""
+import os
+import math
+import time
+import logging
+import functools
+
+from fastapi import HTTPException, Request
+
+from .auth import verify_token
+
+logger = logging.getLogger(__name__)
+
+# load tests turn this off so many simulated turns per user aren't throttled
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+RATE_LIMIT_LEASE_FRACTION = float(os.getenv("RATE_LIMIT_LEASE_FRACTION", "0.2"))
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_rate(rate: str):
+    """"10/minute" -> (10, 60.0)."""
+    count, _, period = rate.partition("/")
+    period = period.strip().lower().rstrip("s")
+    if period not in _PERIODS:
+        raise ValueError(f"Unknown rate limit period in {rate!r}")
+    return int(count), float(_PERIODS[period])
+
+
+class MemoryStore:
+    """Token buckets in this process; the local stand-in for a shared store."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._calls = 0
+
+    async def acquire(self, key: str, capacity: int, rate: float, cost: int = 1):
+        """Take cost tokens if available. Returns (allowed, seconds until they would be)."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets[key] = (tokens, now)
+
+        self._calls += 1
+        if self._calls % 10000 == 0:
+            self._evict_idle(now)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def _evict_idle(self, now: float):
+        # a bucket untouched for a day has long since refilled
+        cutoff = now - _PERIODS["day"]
+        for key in [k for k, (_, updated) in self._buckets.items() if updated < cutoff]:
+            del self._buckets[key]
+
+
+_TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+else
+  retry = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(retry)}
+"""
+
+
+class RedisStore:
+    """Token buckets in Redis (or any server speaking its protocol and EVALSHA)."""
+
+    def __init__(self, uri: str):
+        from redis.asyncio import Redis
+
+        self._client = Redis.from_url(uri)
+        self._script = self._client.register_script(_TOKEN_BUCKET_LUA)
+
+    async def acquire(self, key: str, capacity: int, rate: float, cost: int = 1):
+        allowed, retry = await self._script(keys=[key], args=[capacity, rate, cost])
+        return bool(allowed), float(retry)
+
+
+class RateLimiter:
+    def __init__(self, store, lease_fraction: float = RATE_LIMIT_LEASE_FRACTION):
+        self.store = store
+        self.lease_fraction = lease_fraction
+        self._leases = {}
+        self._hits = 0
+        self.local_hits = 0
+        self.store_calls = 0
+
+    async def hit(self, key: str, capacity: int, period: float):
+        """Count one request against key; returns None if allowed, else seconds to wait."""
+        now = time.monotonic()
+        self._hits += 1
+        if self._hits % 10000 == 0:
+            self._evict_expired(now)
+
+        lease = self._leases.get(key)
+        if lease is not None:
+            if lease[0] > 0 and lease[1] > now:
+                lease[0] -= 1
+                self.local_hits += 1
+                return None
+            del self._leases[key]
+
+        rate = capacity / period
+        size = int(capacity * self.lease_fraction)
+        if size > 1:
+            self.store_calls += 1
+            allowed, _ = await self.store.acquire(key, capacity, rate, size)
+            if allowed:
+                # unused tokens lapse after the time they took to refill, so an idle
+                # worker can't sit on another worker's allowance
+                self._leases[key] = [size - 1, now + size / rate]
+                return None
+
+        self.store_calls += 1
+        allowed, retry_after = await self.store.acquire(key, capacity, rate, 1)
+        return None if allowed else retry_after
+
+    def _evict_expired(self, now: float):
+        # one lease per client seen; without a sweep the dict grows with every new IP
+        for key in [k for k, (tokens, expires) in self._leases.items() if tokens <= 0 or expires <= now]:
+            del self._leases[key]
+
+    def limit(self, rate: str, scope: str = None):
+        """Route decorator; the endpoint must take ``request: Request``. Routes with the
+        same scope share one budget."""
+        capacity, period = parse_rate(rate)
+
+        def decorator(func):
+            if not RATE_LIMIT_ENABLED:
+                return func
+            name = scope or func.__name__
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                key = f"rl:{name}:{client_key(kwargs['request'], kwargs.get('current_user'))}"
+                try:
+                    retry_after = await self.hit(key, capacity, period)
+                except Exception:
+                    # a rate-limit store outage shouldn't take the API down with it
+                    logger.exception("Rate limit store unavailable, allowing request")
+                    retry_after = None
+                if retry_after is not None:
+                    raise HTTPException(
+                        status_code=429,
+                        detail=f"Rate limit exceeded: {rate}",
+                        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+                    )
+                return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def stats(self) -> dict:
+        return {
+            "store": type(self.store).__name__,
+            "local_hits": self.local_hits,
+            "store_calls": self.store_calls,
+        }
+
+
+def client_ip(request: Request) -> str:
+    if TRUSTED_PROXY_HOPS > 0:
+        forwarded = [h.strip() for h in request.headers.get("x-forwarded-for", "").split(",") if h.strip()]
+        # entries left of what our own proxies appended are client-controlled
+        if len(forwarded) >= TRUSTED_PROXY_HOPS:
+            return forwarded[-TRUSTED_PROXY_HOPS]
+    return request.client.host if request.client else "unknown"
+
+
+def client_key(request: Request, current_user: dict = None) -> str:
+    if current_user and current_user.get("user_id"):
+        return f"user:{current_user['user_id']}"
+    parts = request.headers.get("authorization", "").split()
+    if len(parts) == 2 and parts[0].lower() == "bearer":
+        payload = verify_token(parts[1])
+        if payload and payload.get("user_id"):
+            return f"user:{payload['user_id']}"
+    return f"ip:{client_ip(request)}"
+
+
+def create_limiter(uri: str = RATE_LIMIT_STORAGE_URI) -> RateLimiter:
+    if uri.startswith("memory://"):
+        # already local, a lease would only add expiry
+        return RateLimiter(MemoryStore(), lease_fraction=0)
+    if uri.startswith(("redis://", "rediss://", "unix://")):
+        return RateLimiter(RedisStore(uri))
+    raise ValueError(f"Unsupported RATE_LIMIT_STORAGE_URI: {uri}")
@@ -0,0 +1,73 @@
+import os
+import threading
+from collections import OrderedDict
+
+from .embedding_service import normalise_query
+
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "2048"))
+
+
+class RetrievalCache:
+    """LRU of normalised query -> ranked chunk ids for one index version.
+
+    Only ids are kept, so a hit skips the embedding, ANN search and MMR but still
+    reads chunk text from the docstore. Seeing a new index version empties it.
+    """
+
+    def __init__(self, max_entries: int = RETRIEVAL_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _check_version(self, version):
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get(self, version, query: str):
+        if self.max_entries <= 0:
+            return None
+        key = normalise_query(query)
+        with self._lock:
+            self._check_version(version)
+            ids = self._entries.get(key)
+            if ids is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return ids
+
+    def put(self, version, query: str, docs):
+        if self.max_entries <= 0 or any(doc.id is None for doc in docs):
+            return
+        key = normalise_query(query)
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = [doc.id for doc in docs]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_cache = None
+
+
+def get_retrieval_cache() -> RetrievalCache:
+    global _cache
+    if _cache is None:
+        _cache = RetrievalCache()
+    return _cache
@@ -0,0 +1,181 @@
+"""Multi-pattern safety filter built on an Aho-Corasick automaton.
+
+Patterns are loaded from SAFETY_PATTERNS_PATH (``[category]`` sections, one phrase per
+line) and compiled once, so scanning a message costs O(message length + matches)
+however many phrases compliance adds. Messages and phrases go through the same
+normalisation and only whole-word matches count.
+"""
+import os
+import re
+import logging
+import threading
+import unicodedata
+from collections import deque
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SAFETY_PATTERNS_PATH = os.getenv(
+    "SAFETY_PATTERNS_PATH", os.path.join(BASE_DIR, "data", "safety_patterns.txt")
+)
+
+SELF_HARM = "self_harm"
+EMERGENCY = "emergency"
+ABUSE = "abuse"
+
+# when a message matches several categories the first one here wins
+CATEGORY_PRIORITY = (SELF_HARM, EMERGENCY, ABUSE)
+
+_SUBSTITUTIONS = str.maketrans({
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t",
+    "@": "a", "$": "s", "!": "i", "|": "i",
+})
+# Cyrillic/Greek letters that NFKD leaves alone but render like Latin ones
+_HOMOGLYPHS = str.maketrans({
+    "а": "a", "е": "e", "о": "o", "р": "p", "с": "c", "у": "y", "х": "x",
+    "і": "i", "ј": "j", "ѕ": "s", "к": "k", "м": "m", "т": "t", "н": "h",
+    "α": "a", "ε": "e", "ι": "i", "κ": "k", "ο": "o", "ρ": "p", "τ": "t", "υ": "u",
+})
+# only look-alikes leading into a letter ("k!ll", "$uicide"), so "myself!" and
+# "took 5 pills" keep their meaning
+_LOOKALIKES = re.compile(r"[013457@$!|]+(?=[^\W\d_])")
+_APOSTROPHES = re.compile(r"['’‘`]")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalise(text: str) -> str:
+    """Fold case, accents, look-alike characters and punctuation; pad with spaces
+    so patterns match on word boundaries only."""
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        # combining marks (accents) and format characters (zero-width joiners etc.)
+        text = "".join(
+            c for c in text
+            if not unicodedata.combining(c) and unicodedata.category(c) != "Cf"
+        )
+        text = text.casefold().translate(_HOMOGLYPHS)
+    else:
+        text = text.casefold()
+    text = _LOOKALIKES.sub(lambda m: m.group().translate(_SUBSTITUTIONS), text)
+    text = _APOSTROPHES.sub("", text)
+    text = _NON_WORD.sub(" ", text)
+    return f" {' '.join(text.split())} "
+
+
+class SafetyMatch(NamedTuple):
+    category: str
+    pattern: str
+
+
+class AhoCorasick:
+    """Character trie with failure links; outputs are merged along the failure
+    chain at build time so matching never walks it."""
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._built = False
+
+    def add(self, key: str, value):
+        if self._built:
+            raise RuntimeError("Cannot add patterns after build()")
+        state = 0
+        for ch in key:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(value)
+
+    def build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        self._built = True
+        return self
+
+    def __len__(self):
+        return len(self._goto)
+
+    def iter(self, text: str):
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                yield from out[state]
+
+
+class SafetyFilter:
+    def __init__(self, patterns: dict):
+        self.pattern_count = 0
+        self._automaton = AhoCorasick()
+        for category, phrases in patterns.items():
+            for phrase in phrases:
+                key = normalise(phrase)
+                if key.strip():
+                    self._automaton.add(key, SafetyMatch(category, phrase))
+                    self.pattern_count += 1
+        self._automaton.build()
+
+    @classmethod
+    def from_file(cls, path: str = SAFETY_PATTERNS_PATH):
+        patterns, category = {}, None
+        with open(path, encoding="utf-8") as f:
+            for lineno, raw in enumerate(f, 1):
+                line = raw.strip()
+                if not line or line.startswith("#"):
+                    continue
+                if line.startswith("[") and line.endswith("]"):
+                    category = line[1:-1].strip()
+                    patterns.setdefault(category, [])
+                elif category is None:
+                    raise ValueError(f"{path}:{lineno}: phrase outside a [category] section")
+                else:
+                    patterns[category].append(line)
+        return cls(patterns)
+
+    def scan(self, message: str) -> list:
+        """All patterns found in message."""
+        return list(self._automaton.iter(normalise(message)))
+
+    def categorise(self, message: str) -> Optional[str]:
+        """Highest-priority category matched by message, or None if it is clean."""
+        found = {m.category for m in self._automaton.iter(normalise(message))}
+        if not found:
+            return None
+        for category in CATEGORY_PRIORITY:
+            if category in found:
+                return category
+        return sorted(found)[0]
+
+
+_filter = None
+_filter_lock = threading.Lock()
+
+
+def get_safety_filter() -> SafetyFilter:
+    global _filter
+    if _filter is None:
+        with _filter_lock:
+            if _filter is None:
+                _filter = SafetyFilter.from_file()
+                logger.info("Safety filter loaded %d patterns", _filter.pattern_count)
+    return _filter
@@ -0,0 +1,98 @@
+"""
+Content-hashed static assets and cached HTML pages.
+
+Every file under the static dir is also served as `name.<hash>.ext`; those URLs
+never change content, so they carry a one-year immutable Cache-Control. The
+HTML pages are rewritten once to point at the hashed URLs and are served with
+an ETag and `no-cache`, so a deploy reaches browsers on their next revalidation.
+"""
+import os
+import re
+import hashlib
+import logging
+
+from fastapi.staticfiles import StaticFiles
+from fastapi.responses import Response
+
+logger = logging.getLogger(__name__)
+
+STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", str(365 * 24 * 3600)))
+
+IMMUTABLE = f"public, max-age={STATIC_MAX_AGE}, immutable"
+REVALIDATE = "no-cache"
+
+_ASSET_REF = re.compile(r'((?:src|href)=["\'])/?static/([^"\'?#]+)')
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def build_manifest(static_dir: str) -> dict:
+    """Map each static file's relative path to its content-hashed name."""
+    manifest = {}
+    for root, _, files in os.walk(static_dir):
+        for name in files:
+            full = os.path.join(root, name)
+            rel = os.path.relpath(full, static_dir).replace(os.sep, "/")
+            with open(full, "rb") as f:
+                digest = _digest(f.read())
+            stem, ext = os.path.splitext(rel)
+            manifest[rel] = f"{stem}.{digest}{ext}"
+    return manifest
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # weak comparison, as RFC 9110 requires for If-None-Match
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == bare for tag in if_none_match.split(","))
+
+
+class HashedStaticFiles(StaticFiles):
+    """StaticFiles that also answers hashed names, with long-lived caching on them."""
+
+    def __init__(self, directory: str):
+        super().__init__(directory=directory)
+        self.manifest = build_manifest(directory)
+        self._originals = {hashed: rel for rel, hashed in self.manifest.items()}
+
+    def url(self, rel: str) -> str:
+        return "/static/" + self.manifest.get(rel, rel)
+
+    async def get_response(self, path: str, scope):
+        original = self._originals.get(path.replace(os.sep, "/"))
+        response = await super().get_response(original or path, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE if original else REVALIDATE
+        return response
+
+
+class Pages:
+    """HTML pages with static references rewritten to hashed URLs, cached in memory."""
+
+    def __init__(self, frontend_dir: str, static: HashedStaticFiles = None):
+        self.frontend_dir = frontend_dir
+        self.static = static
+        self._cache = {}
+
+    def _load(self, name: str):
+        cached = self._cache.get(name)
+        if cached is None:
+            with open(os.path.join(self.frontend_dir, name), encoding="utf-8") as f:
+                html = f.read()
+            if self.static is not None:
+                html = _ASSET_REF.sub(lambda m: m.group(1) + self.static.url(m.group(2)), html)
+            body = html.encode("utf-8")
+            cached = self._cache[name] = (body, f'"{_digest(body)}"')
+        return cached
+
+    def response(self, request, name: str) -> Response:
+        body, etag = self._load(name)
+        headers = {"ETag": etag, "Cache-Control": REVALIDATE}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="text/html", headers=headers)
@@ -1,6 +1,17 @@
 import os
-from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
+import time
+import logging
+import threading
+from typing import Any
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+from .embedding_service import BatchingEmbeddings
+from .metrics import timed
+from .retrieval_cache import get_retrieval_cache
+
+# faiss, the index store and the embedding model are imported on first use so that
+# importing the app (and answering /api/health) doesn't wait for them
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -9,43 +20,209 @@ VECTOR_STORE_PATH = os.getenv(
     os.path.abspath(os.path.join(BASE_DIR, "..", "vector_store_db"))
 )
 
+INDEX_MMAP = os.getenv("INDEX_MMAP", "true").lower() == "true"
+
+# "onnx" serves the quantised model from app/onnx_embeddings.py and never imports torch
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch").lower()
+
+# seconds between checks of index.faiss for a new version; 0 disables watching
+INDEX_WATCH_INTERVAL = float(os.getenv("INDEX_WATCH_INTERVAL", "30"))
+
+logger = logging.getLogger(__name__)
+
 _embeddings = None
 _retriever = None
+_index_manager = None
+_init_lock = threading.Lock()
+_embeddings_lock = threading.Lock()
+
+
+def _load_embedding_model():
+    if EMBED_BACKEND == "onnx":
+        from .onnx_embeddings import OnnxEmbeddings
+        return OnnxEmbeddings()
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(
+        model_name="BAAI/bge-small-en-v1.5",
+        cache_folder="./hf_cache",
+        encode_kwargs={"normalize_embeddings": True}
+    )
 
 
 def _get_embeddings():
     global _embeddings
 
     if _embeddings is None:
-        _embeddings = HuggingFaceEmbeddings(
-            model_name="BAAI/bge-small-en-v1.5",
-            cache_folder="./hf_cache",
-            encode_kwargs={"normalize_embeddings": True}
-        )
+        with _embeddings_lock:
+            if _embeddings is None:
+                start = time.perf_counter()
+                _embeddings = BatchingEmbeddings(_load_embedding_model())
+                logger.info("Loaded %s embedding model in %.2fs",
+                            EMBED_BACKEND, time.perf_counter() - start)
 
     return _embeddings
 
 
+def index_version():
+    """Modification time of the on-disk index; IndexManager swaps when it changes."""
+    from .index_store import INDEX_FILE
+
+    try:
+        return os.stat(os.path.join(VECTOR_STORE_PATH, INDEX_FILE)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def load_index(path: str = VECTOR_STORE_PATH):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Vector store not found at {path}")
+
+    from .ann_index import tune_index
+    from .index_store import load_index as load_store
+
+    db = load_store(path, _get_embeddings(), mmap=INDEX_MMAP)
+    tune_index(db.index)
+    return db
+
+
+class _IndexHandle:
+    def __init__(self, db, version, lexical=None):
+        self.db = db
+        self.version = version
+        from .mmr import MMRRetriever
+        from .hybrid_retrieval import HybridRetriever, HYBRID_RETRIEVAL
+
+        self.retriever = MMRRetriever(vectorstore=db)
+        if lexical is not None and HYBRID_RETRIEVAL:
+            self.retriever = HybridRetriever(dense=self.retriever, lexical=lexical, vectorstore=db)
+        self.refs = 0
+        self.retired = False
+
+
+class IndexManager:
+    """Owns the live FAISS index and swaps in new versions without stalling requests.
+
+    Requests acquire the current handle and release it when done; a reload builds the
+    new index off to the side and swaps the pointer under a lock, so in-flight searches
+    finish on the old index, which is dropped once its reference count reaches zero.
+    """
+
+    def __init__(self, path: str = VECTOR_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._current = self._load()
+        self._watcher = None
+
+    def _load(self) -> _IndexHandle:
+        from .hybrid_retrieval import BM25Index
+
+        version = index_version()
+        return _IndexHandle(load_index(self.path), version, BM25Index.load(self.path, mmap=INDEX_MMAP))
+
+    @property
+    def version(self):
+        return self._current.version
+
+    def acquire(self) -> _IndexHandle:
+        with self._lock:
+            handle = self._current
+            handle.refs += 1
+            return handle
+
+    def release(self, handle: _IndexHandle):
+        with self._lock:
+            handle.refs -= 1
+            if handle.retired and handle.refs == 0:
+                logger.info("Index version %s drained and released", handle.version)
+                handle.db = handle.retriever = None
+
+    def reload(self) -> bool:
+        """Load the on-disk index and swap it in. Returns False if it was already current."""
+        with self._reload_lock:
+            version = index_version()
+            if version == self._current.version:
+                return False
+
+            logger.info("Loading index version %s", version)
+            new = self._load()
+
+            with self._lock:
+                old, self._current = self._current, new
+                old.retired = True
+                if old.refs == 0:
+                    old.db = old.retriever = None
+            logger.info("Swapped index %s -> %s", old.version, version)
+            return True
+
+    def reload_in_background(self):
+        threading.Thread(target=self._safe_reload, name="index-reload", daemon=True).start()
+
+    def _safe_reload(self):
+        try:
+            self.reload()
+        except Exception:
+            # keep serving the old index, the next poll retries
+            logger.exception("Index reload failed, keeping version %s", self._current.version)
+
+    def start_watching(self, interval: float = INDEX_WATCH_INTERVAL):
+        if interval <= 0 or self._watcher is not None:
+            return
+
+        def watch():
+            while True:
+                time.sleep(interval)
+                if index_version() != self._current.version:
+                    self._safe_reload()
+
+        self._watcher = threading.Thread(target=watch, name="index-watcher", daemon=True)
+        self._watcher.start()
+
+
+class SwappableRetriever(BaseRetriever):
+    """Retriever that always searches the manager's current index."""
+
+    manager: Any
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun):
+        from .index_store import StaleDocstoreError
+
+        handle = self.manager.acquire()
+        cache = get_retrieval_cache()
+        try:
+            with timed("retrieval"):
+                ids = cache.get(handle.version, query)
+                if ids is not None:
+                    docs = [handle.db.docstore.search(doc_id) for doc_id in ids]
+                    if not any(isinstance(doc, str) for doc in docs):
+                        return docs
+                docs = handle.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+                cache.put(handle.version, query, docs)
+                return docs
+        except StaleDocstoreError:
+            # this process's first read of an index replaced on disk since it was loaded
+            self.manager.reload_in_background()
+            raise
+        finally:
+            self.manager.release(handle)
+
+
+def get_index_manager() -> IndexManager:
+    global _index_manager
+
+    if _index_manager is None:
+        with _init_lock:
+            if _index_manager is None:
+                _index_manager = IndexManager(VECTOR_STORE_PATH)
+
+    return _index_manager
+
+
 def get_retriever():
     global _retriever
 
     if _retriever is None:
-
-        if not os.path.exists(VECTOR_STORE_PATH):
-            raise FileNotFoundError(f"Vector store not found at {VECTOR_STORE_PATH}")
-
-        db = FAISS.load_local(
-            VECTOR_STORE_PATH,
-            _get_embeddings(),
-            allow_dangerous_deserialization=True
-        )
-
-        _retriever = db.as_retriever(
-            search_type="mmr",
-            search_kwargs={
-                "k": 5,
-                "fetch_k": 20
-            }
-        )
+        _retriever = SwappableRetriever(manager=get_index_manager())
 
     return _retriever
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""Recall@k, QPS and memory of the FAISS index types on synthetic corpora.
+
+Vectors are drawn around random cluster centres and L2-normalised, like bge-small
+embeddings (dim 384). Recall is measured against exact Flat search.
+
+    PYTHONPATH=. python -m backend.benchmarks.ann_index --sizes 10000,100000 --k 20
+"""
+import time
+import argparse
+
+import faiss
+import numpy as np
+
+from backend.app.ann_index import INDEX_TYPES, build_index, tune_index, factory_string
+
+
+def synthetic_corpus(n: int, dim: int, n_queries: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((max(1, n // 100), dim)).astype(np.float32)
+    points = centres[rng.integers(0, len(centres), n + n_queries)]
+    points += 0.35 * rng.standard_normal(points.shape).astype(np.float32)
+    points /= np.linalg.norm(points, axis=1, keepdims=True)
+    return points[:n], points[n:]
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    k = truth.shape[1]
+    hits = sum(len(np.intersect1d(f, t)) for f, t in zip(found, truth))
+    return hits / (len(truth) * k)
+
+
+def bench(index, queries: np.ndarray, k: int):
+    start = time.perf_counter()
+    _, found = index.search(queries, k)
+    elapsed = time.perf_counter() - start
+    return found, len(queries) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--types", default=",".join(INDEX_TYPES))
+    parser.add_argument("--nprobe", default="8,16,32")
+    parser.add_argument("--ef-search", default="32,64,128")
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(1)  # per-request search is single-threaded in the app
+
+    print(f"{'n':>8} {'index':>22} {'knob':>12} {'recall@k':>9} {'qps':>9} {'MB':>8} {'build s':>8}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        corpus, queries = synthetic_corpus(n, args.dim, args.queries)
+
+        exact = faiss.IndexFlatL2(args.dim)
+        exact.add(corpus)
+        truth, _ = bench(exact, queries, args.k)
+
+        for index_type in args.types.split(","):
+            start = time.perf_counter()
+            index = build_index(corpus, index_type)
+            build_s = time.perf_counter() - start
+            mb = faiss.serialize_index(index).nbytes / 2 ** 20
+            spec = factory_string(index_type, n, args.dim)
+
+            if "IVF" in spec:
+                knobs = [("nprobe", int(v)) for v in args.nprobe.split(",")]
+            elif "HNSW" in spec:
+                knobs = [("efSearch", int(v)) for v in args.ef_search.split(",")]
+            else:
+                knobs = [("-", None)]
+
+            for name, value in knobs:
+                if name == "nprobe":
+                    tune_index(index, nprobe=value)
+                elif name == "efSearch":
+                    tune_index(index, ef_search=value)
+                found, qps = bench(index, queries, args.k)
+                knob = f"{name}={value}" if value is not None else "-"
+                print(f"{n:>8} {spec:>22} {knob:>12} {recall_at_k(found, truth):>9.3f} "
+                      f"{qps:>9.0f} {mb:>8.1f} {build_s:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Sync (threadpool) vs async (motor) chat-turn throughput.
+
+Runs the storage calls of one /api/chat turn against a local mongod with the
+LLM replaced by a fixed sleep, so the numbers reflect I/O concurrency rather
+than Groq. The sync side is the old pymongo path, kept here as the baseline.
+
+    PYTHONPATH=. python -m backend.benchmarks.async_path --turns 2000 --concurrency 400
+"""
+import os
+import time
+import uuid
+import asyncio
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_TLS", "false")
+os.environ.setdefault("MONGO_DB", "medibot_bench")
+
+from pymongo import DESCENDING  # noqa: E402
+
+from backend.app import chat_storage  # noqa: E402
+from backend.app.db import client, chats, messages, MONGO_DB  # noqa: E402
+
+# AnyIO's default threadpool size, i.e. what sync FastAPI routes get
+THREADPOOL_SIZE = 40
+
+
+def start_chat(user_id: str) -> str:
+    chat_id = str(uuid.uuid4())
+    now = datetime.utcnow()
+    chats.insert_one({"chat_id": chat_id, "user_id": user_id, "title": None, "created_at": now, "updated_at": now})
+    return chat_id
+
+
+def get_chat_history(chat_id: str, user_id: str, limit: int = chat_storage.HISTORY_PAGE_SIZE):
+    chat = chats.find_one({"chat_id": chat_id, "user_id": user_id})
+    page = list(messages.find({"chat_id": chat_id}).sort("_id", DESCENDING).limit(limit + 1))
+    return chat_storage._serialize_chat(chat, page, limit)
+
+
+def save_msg(chat_id: str, role: str, content: str):
+    now = datetime.utcnow()
+    chats.update_one({"chat_id": chat_id}, {"$set": {"updated_at": now, "preview": content[:chat_storage.PREVIEW_CHARS]}})
+    messages.insert_one(chat_storage._new_message(chat_id, role, content, now))
+
+
+def _sync_turn(chat_id: str, user_id: str, llm_latency: float):
+    get_chat_history(chat_id, user_id)
+    save_msg(chat_id, "user", "what are hypertension symptoms")
+    time.sleep(llm_latency)
+    save_msg(chat_id, "assistant", "• stub answer")
+
+
+async def _async_turn(chat_id: str, user_id: str, llm_latency: float):
+    await chat_storage.aget_chat_history(chat_id, user_id)
+    await chat_storage.asave_msg(chat_id, "user", "what are hypertension symptoms")
+    await asyncio.sleep(llm_latency)
+    await chat_storage.asave_msg(chat_id, "assistant", "• stub answer")
+
+
+def run_sync(chat_ids, user_id, turns, llm_latency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADPOOL_SIZE) as pool:
+        futures = [
+            pool.submit(_sync_turn, chat_ids[i % len(chat_ids)], user_id, llm_latency)
+            for i in range(turns)
+        ]
+        for f in futures:
+            f.result()
+    return turns / (time.perf_counter() - start)
+
+
+async def run_async(chat_ids, user_id, turns, concurrency, llm_latency):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with sem:
+            await _async_turn(chat_ids[i % len(chat_ids)], user_id, llm_latency)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(turns)))
+    return turns / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=400)
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--llm-latency-ms", type=float, default=500)
+    args = parser.parse_args()
+
+    user_id = "bench-user"
+    llm_latency = args.llm_latency_ms / 1000
+    chat_ids = [start_chat(user_id) for _ in range(args.chats)]
+
+    try:
+        sync_rps = run_sync(chat_ids, user_id, args.turns, llm_latency)
+        async_rps = asyncio.run(
+            run_async(chat_ids, user_id, args.turns, args.concurrency, llm_latency)
+        )
+    finally:
+        client.drop_database(MONGO_DB)
+
+    print(f"turns={args.turns} llm_latency_ms={args.llm_latency_ms:g}")
+    print(f"sync  (threadpool={THREADPOOL_SIZE}): {sync_rps:8.1f} turns/s")
+    print(f"async (concurrency={args.concurrency}): {async_rps:8.1f} turns/s")
+    print(f"speedup: {async_rps / sync_rps:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Chat latency under a login burst: bcrypt on the shared threadpool vs. a process pool.
+
+Open-loop chat traffic (two short CPU steps through asyncio.to_thread around a fake
+LLM wait, like the intent router and cache lookups) runs alongside a stream of
+logins. Compares no logins, the old ``asyncio.to_thread(bcrypt.checkpw)`` path and
+``passwords.acheck_password`` on the bounded process pool. No Mongo needed.
+
+    PYTHONPATH=. python -m backend.benchmarks.auth_load --chat-rps 50 --login-rps 20
+"""
+import time
+import asyncio
+import argparse
+import statistics
+
+import bcrypt
+from fastapi import HTTPException
+
+from backend.app import passwords
+
+PASSWORD = b"correct horse battery staple"
+
+
+def _cpu_work(ms: float):
+    end = time.perf_counter() + ms / 1000
+    while time.perf_counter() < end:
+        pass
+
+
+async def chat_request(cpu_ms: float, llm_ms: float) -> float:
+    start = time.perf_counter()
+    await asyncio.to_thread(_cpu_work, cpu_ms)
+    await asyncio.sleep(llm_ms / 1000)
+    await asyncio.to_thread(_cpu_work, cpu_ms)
+    return time.perf_counter() - start
+
+
+async def run(mode: str, hashed: bytes, args) -> dict:
+    chat_latencies, outcomes = [], {"ok": 0, "rejected": 0}
+
+    async def login():
+        try:
+            if mode == "threadpool":
+                await asyncio.to_thread(bcrypt.checkpw, PASSWORD, hashed)
+            else:
+                await passwords.acheck_password(PASSWORD.decode(), hashed.decode())
+            outcomes["ok"] += 1
+        except HTTPException:
+            outcomes["rejected"] += 1
+
+    async def chat():
+        chat_latencies.append(await chat_request(args.cpu_ms, args.llm_ms))
+
+    tasks = []
+    start = time.perf_counter()
+    chats = logins = 0
+    while (elapsed := time.perf_counter() - start) < args.duration:
+        while chats < elapsed * args.chat_rps:
+            tasks.append(asyncio.create_task(chat()))
+            chats += 1
+        while mode != "no logins" and logins < elapsed * args.login_rps:
+            tasks.append(asyncio.create_task(login()))
+            logins += 1
+        await asyncio.sleep(0.002)
+    await asyncio.gather(*tasks)
+
+    chat_latencies.sort()
+    return {
+        "p50": statistics.median(chat_latencies) * 1000,
+        "p99": chat_latencies[int(len(chat_latencies) * 0.99) - 1] * 1000,
+        **outcomes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--chat-rps", type=float, default=50)
+    parser.add_argument("--login-rps", type=float, default=20)
+    parser.add_argument("--cpu-ms", type=float, default=5)
+    parser.add_argument("--llm-ms", type=float, default=300)
+    args = parser.parse_args()
+
+    hashed = bcrypt.hashpw(PASSWORD, bcrypt.gensalt(passwords.BCRYPT_ROUNDS))
+    passwords.start_pool()
+    print(f"bcrypt rounds={passwords.BCRYPT_ROUNDS} pool workers={passwords.PASSWORD_HASH_WORKERS} "
+          f"max pending={passwords.PASSWORD_HASH_MAX_PENDING}")
+    print(f"{'mode':>12} {'chat p50 ms':>12} {'chat p99 ms':>12} {'logins ok':>10} {'rejected':>9}")
+    try:
+        for mode in ("no logins", "threadpool", "process pool"):
+            r = asyncio.run(run(mode, hashed, args))
+            print(f"{mode:>12} {r['p50']:>12.1f} {r['p99']:>12.1f} {r['ok']:>10} {r['rejected']:>9}")
+    finally:
+        passwords.stop_pool()
+
+
+if __name__ == "__main__":
+    main()
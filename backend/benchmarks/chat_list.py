@@ -0,0 +1,89 @@
+"""Sidebar chat-list cost with 10k chats per user: full documents vs summary pages.
+
+"full" is the old behaviour (every chat document, no projection/sort/limit);
+"summary" is one alist_user_chats page through the (user_id, updated_at) index.
+
+    PYTHONPATH=. python -m backend.benchmarks.chat_list --chats 10000
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_TLS", "false")
+os.environ.setdefault("MONGO_DB", "medibot_bench")
+
+from bson import json_util  # noqa: E402
+from pymongo import ASCENDING, DESCENDING  # noqa: E402
+
+from backend.app import chat_storage  # noqa: E402
+from backend.app.db import client, chats, MONGO_DB  # noqa: E402
+
+
+def seed(user_id: str, n: int, messages_per_chat: int):
+    now = datetime.utcnow()
+    answer = "• **Overview** hypertension is sustained elevation of arterial pressure " * 8
+    docs = []
+    for i in range(n):
+        updated = now - timedelta(minutes=i)
+        docs.append({
+            "chat_id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "title": f"Blood pressure question {i}",
+            "preview": answer[:chat_storage.PREVIEW_CHARS],
+            # old-schema payload, what an unprojected find() used to ship
+            "messages": [{"role": "assistant", "content": answer, "timestamp": updated}] * messages_per_chat,
+            "created_at": updated,
+            "updated_at": updated,
+        })
+    chats.insert_many(docs)
+    chats.create_index([("user_id", ASCENDING), ("updated_at", DESCENDING), ("chat_id", DESCENDING)])
+
+
+def measure(fn, repeats: int):
+    times, size = [], 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        size = len(json.dumps(result, default=json_util.default))
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, size / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chats", type=int, default=10000)
+    parser.add_argument("--messages-per-chat", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    user_id = "bench-user"
+    seed(user_id, args.chats, args.messages_per_chat)
+    loop = asyncio.new_event_loop()
+
+    def list_chats(cursor=None):
+        return loop.run_until_complete(chat_storage.alist_user_chats(user_id, cursor=cursor))
+
+    try:
+        full_ms, full_kb = measure(lambda: list(chats.find({"user_id": user_id})), args.repeats)
+        page_ms, page_kb = measure(list_chats, args.repeats)
+        cursor = list_chats()["next_cursor"]
+        next_ms, _ = measure(lambda: list_chats(cursor), args.repeats)
+    finally:
+        loop.close()
+        client.drop_database(MONGO_DB)
+
+    print(f"chats={args.chats} messages/chat={args.messages_per_chat}")
+    print(f"{'':>14} {'median ms':>10} {'payload KB':>11}")
+    print(f"{'full':>14} {full_ms:>10.1f} {full_kb:>11.1f}")
+    print(f"{'summary p1':>14} {page_ms:>10.1f} {page_kb:>11.1f}")
+    print(f"{'summary p2':>14} {next_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
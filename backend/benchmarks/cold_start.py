@@ -0,0 +1,82 @@
+"""Cold start: import time, time-to-ready and RSS for each embedding backend.
+
+Each configuration runs in a fresh interpreter that imports ``backend.app.main``
+and then does what the warm-up thread does (chain, index, intent router, first
+embedding). "eager" re-creates the old behaviour by importing sentence-transformers,
+faiss and LangChain integrations up front. Needs a built index and, for onnx,
+``python -m app.onnx_embeddings`` run first.
+
+    PYTHONPATH=. python -m backend.benchmarks.cold_start --repeat 3
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+CHILD = r"""
+import os, sys, json, time, resource, statistics
+start = time.perf_counter()
+if os.environ.get("BENCH_EAGER") == "1":
+    import sentence_transformers, faiss, langchain_community.vectorstores, langchain_groq
+import backend.app.main
+imported = time.perf_counter() - start
+
+from backend.app.chatbot_logic import _get_chain
+from backend.app.intent_router import get_intent_router
+from backend.app.vector_store import _get_embeddings
+_get_chain()
+get_intent_router()
+embeddings = _get_embeddings()
+embeddings.embed_query("warm up")
+ready = time.perf_counter() - start
+
+latencies = []
+for i in range(20):
+    t = time.perf_counter()
+    embeddings.inner.embed_query(f"what are the symptoms of hypertension {i}")
+    latencies.append(time.perf_counter() - t)
+
+print(json.dumps({
+    "import_s": imported,
+    "ready_s": ready,
+    "embed_ms": statistics.median(latencies) * 1000,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "torch_loaded": "torch" in sys.modules,
+}))
+"""
+
+CONFIGS = [
+    ("eager torch", {"EMBED_BACKEND": "torch", "BENCH_EAGER": "1"}),
+    ("lazy torch", {"EMBED_BACKEND": "torch"}),
+    ("lazy onnx", {"EMBED_BACKEND": "onnx"}),
+]
+
+
+def run_child(extra_env: dict) -> dict:
+    env = dict(os.environ, **extra_env)
+    env.setdefault("GROQ_API_KEY", "bench")
+    env.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    env.setdefault("MONGO_TLS", "false")
+    env.setdefault("INDEX_WATCH_INTERVAL", "0")
+    out = subprocess.run([sys.executable, "-c", CHILD], env=env, check=True,
+                         capture_output=True, text=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'config':>12} {'import s':>9} {'ready s':>8} {'embed ms':>9} {'rss MB':>8} {'torch':>6}")
+    for name, extra_env in CONFIGS:
+        runs = [run_child(extra_env) for _ in range(args.repeat)]
+        med = {k: statistics.median(r[k] for r in runs) for k in ("import_s", "ready_s", "embed_ms", "rss_mb")}
+        print(f"{name:>12} {med['import_s']:>9.2f} {med['ready_s']:>8.2f} {med['embed_ms']:>9.2f} "
+              f"{med['rss_mb']:>8.0f} {str(runs[0]['torch_loaded']):>6}")
+
+
+if __name__ == "__main__":
+    main()
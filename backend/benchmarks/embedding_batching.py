@@ -0,0 +1,72 @@
+"""Query-embedding latency and throughput vs. micro-batch size.
+
+Fires concurrent embed_query calls with distinct strings (cache disabled) at the
+bge-small model through BatchingEmbeddings for each max batch size.
+
+    PYTHONPATH=. python -m backend.benchmarks.embedding_batching --concurrency 32
+"""
+import time
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_huggingface import HuggingFaceEmbeddings
+
+from backend.app.embedding_service import BatchingEmbeddings
+
+TOPICS = ["hypertension", "type 2 diabetes", "common cold", "stroke", "heart attack",
+          "ACE inhibitors", "DASH diet", "TIA warning signs"]
+
+
+def _queries(n: int):
+    return [f"what are the symptoms of {TOPICS[i % len(TOPICS)]} case {i}" for i in range(n)]
+
+
+def run(model, batch_size: int, max_wait_ms: float, concurrency: int, total: int):
+    service = BatchingEmbeddings(model, max_batch_size=batch_size,
+                                 max_wait_ms=max_wait_ms, cache_size=0)
+    latencies = []
+
+    def one(q):
+        start = time.perf_counter()
+        service.embed_query(q)
+        latencies.append(time.perf_counter() - start)
+
+    queries = _queries(total)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, queries))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "qps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "avg_batch": service.stats()["avg_batch_size"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--queries", type=int, default=512)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    parser.add_argument("--batch-sizes", default="1,4,8,16,32,64")
+    args = parser.parse_args()
+
+    model = HuggingFaceEmbeddings(
+        model_name="BAAI/bge-small-en-v1.5",
+        cache_folder="./hf_cache",
+        encode_kwargs={"normalize_embeddings": True}
+    )
+    model.embed_documents(["warm up"])
+
+    print(f"{'batch':>6} {'qps':>8} {'p50 ms':>8} {'p95 ms':>8} {'avg batch':>10}")
+    for size in (int(b) for b in args.batch_sizes.split(",")):
+        r = run(model, size, args.max_wait_ms, args.concurrency, args.queries)
+        print(f"{size:>6} {r['qps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['avg_batch']:>10}")
+
+
+if __name__ == "__main__":
+    main()
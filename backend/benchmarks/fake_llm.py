@@ -0,0 +1,115 @@
+"""Local OpenAI-compatible chat-completions server for exercising the LLM gateway.
+
+Serves the path the Groq SDK calls (/openai/v1/chat/completions), streaming or not,
+with per-model latency, tail stalls and 429/503 error rates. Point the app at it with
+
+    GROQ_BASE_URL=http://127.0.0.1:8900 GROQ_API_KEY=fake
+
+    PYTHONPATH=. python -m backend.benchmarks.fake_llm --port 8900 --error-rate 0.1
+"""
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import threading
+from dataclasses import dataclass
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ANSWER = ("• High blood pressure often has no symptoms.\n• Severe cases can cause headaches, "
+          "shortness of breath or nosebleeds.\n• Please consult a doctor for proper diagnosis.")
+
+
+@dataclass
+class ModelProfile:
+    latency_ms: float = 300       # median time to first token
+    stall_rate: float = 0.0       # fraction of calls that take stall_ms instead
+    stall_ms: float = 8000
+    error_rate: float = 0.0       # fraction answered with 429/503
+    token_ms: float = 5           # delay between streamed tokens
+
+
+def create_app(profiles: dict, default: ModelProfile = None) -> FastAPI:
+    default = default or ModelProfile()
+    app = FastAPI()
+    app.state.calls = {}
+
+    @app.post("/openai/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "")
+        profile = profiles.get(model, default)
+        app.state.calls[model] = app.state.calls.get(model, 0) + 1
+
+        if random.random() < profile.error_rate:
+            status = random.choice((429, 503))
+            return JSONResponse({"error": {"message": "fake overload", "type": "overloaded"}},
+                                status_code=status, headers={"retry-after": "0"})
+
+        stalled = random.random() < profile.stall_rate
+        delay = profile.stall_ms if stalled else random.lognormvariate(0, 0.25) * profile.latency_ms
+        await asyncio.sleep(delay / 1000)
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        usage = {"prompt_tokens": 200, "completion_tokens": len(ANSWER.split()),
+                 "total_tokens": 200 + len(ANSWER.split())}
+
+        if not body.get("stream"):
+            return {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": ANSWER}}],
+                "usage": usage,
+            }
+
+        async def events():
+            for i, word in enumerate(ANSWER.split(" ")):
+                chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                         "model": model, "choices": [{"index": 0, "finish_reason": None,
+                         "delta": {"role": "assistant", "content": word if i == 0 else " " + word}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(profile.token_ms / 1000)
+            done = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                    "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                    "x_groq": {"usage": usage}}
+            yield f"data: {json.dumps(done)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def stats():
+        return app.state.calls
+
+    return app
+
+
+def serve_in_background(app: FastAPI, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--stall-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--token-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    profile = ModelProfile(args.latency_ms, args.stall_rate, error_rate=args.error_rate,
+                           token_ms=args.token_ms)
+    uvicorn.run(create_app({}, profile), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
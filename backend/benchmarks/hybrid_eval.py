@@ -0,0 +1,73 @@
+"""Offline retrieval eval: dense MMR vs BM25 vs hybrid RRF on labelled queries.
+
+Each query is labelled with the knowledge-base file that answers it; a retriever
+scores a hit if any of its top-k chunks comes from that file. Needs an index built
+by ``python -m app.ingest`` (chunk metadata carries the source file name).
+
+    PYTHONPATH=. python -m backend.benchmarks.hybrid_eval
+"""
+import time
+import argparse
+
+from backend.app.vector_store import get_index_manager
+from backend.app.hybrid_retrieval import HybridRetriever
+
+LABELLED_QUERIES = [
+    ("ACE inhibitors and ARBs", "hypertension.txt"),
+    ("DASH eating plan", "hypertension.txt"),
+    ("thiazide diuretics", "hypertension.txt"),
+    ("is high blood pressure usually symptomatic", "hypertension.txt"),
+    ("metformin first-line", "type2_diabetes.txt"),
+    ("HbA1c 6.5% threshold", "type2_diabetes.txt"),
+    ("SGLT2 inhibitors GLP-1", "type2_diabetes.txt"),
+    ("polyuria polydipsia polyphagia", "type2_diabetes.txt"),
+    ("diabetic ketoacidosis warning signs", "type2_diabetes.txt"),
+    ("F.A.S.T. facial droop arm weakness", "stroke_emergency.txt"),
+    ("sudden slurred speech", "stroke_emergency.txt"),
+    ("record symptom onset time", "stroke_emergency.txt"),
+    ("chest pain radiating to the jaw", "heart_attack_emergency.txt"),
+    ("AED and CPR for cardiac arrest", "heart_attack_emergency.txt"),
+    ("chew aspirin", "heart_attack_emergency.txt"),
+    ("diaphoresis cold sweat", "heart_attack_emergency.txt"),
+    ("rhinovirus infection", "common_cold.txt"),
+    ("saline nasal irrigation", "common_cold.txt"),
+    ("do antibiotics help a cold", "common_cold.txt"),
+    ("topical decongestant spray", "common_cold.txt"),
+]
+
+
+def evaluate(name: str, search, k: int):
+    hits, rr, elapsed = 0, 0.0, 0.0
+    for query, expected in LABELLED_QUERIES:
+        start = time.perf_counter()
+        docs = search(query)[:k]
+        elapsed += time.perf_counter() - start
+        sources = [d.metadata.get("source") for d in docs]
+        if expected in sources:
+            hits += 1
+            rr += 1 / (sources.index(expected) + 1)
+    n = len(LABELLED_QUERIES)
+    print(f"{name:>8} {hits / n:>8.2f} {rr / n:>8.3f} {elapsed / n * 1000:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    handle = get_index_manager().acquire()
+    retriever = handle.retriever
+    if not isinstance(retriever, HybridRetriever):
+        raise SystemExit("No BM25 index found, rebuild the store with `python -m app.ingest --full`")
+
+    dense = retriever.dense
+    dense.invoke("warm up")
+
+    print(f"{'':>8} {'hit@k':>8} {'MRR':>8} {'ms/query':>10}")
+    evaluate("dense", dense.invoke, args.k)
+    evaluate("bm25", retriever.lexical_documents, args.k)
+    evaluate("hybrid", retriever.invoke, args.k)
+
+
+if __name__ == "__main__":
+    main()
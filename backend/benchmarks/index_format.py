@@ -0,0 +1,107 @@
+"""Per-worker RSS/PSS and cold-start time: pickle store vs mmap + SQLite store.
+
+Writes a synthetic store in both formats, then starts N worker processes per format
+that each load it and run searches while the others are alive, so PSS shows how much
+memory the workers actually share.
+
+    PYTHONPATH=. python -m backend.benchmarks.index_format --chunks 100000 --workers 4
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+from backend.app.index_store import load_index, save_index
+
+DIM = 384
+
+
+def _memory_kb():
+    stats = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss"):
+                stats[key] = int(value.split()[0])
+    return stats
+
+
+def child(fmt: str, path: str, searches: int):
+    start = time.perf_counter()
+    if fmt == "pickle":
+        db = FAISS.load_local(path, None, allow_dangerous_deserialization=True)
+    else:
+        db = load_index(path, None, mmap=True)
+    load_s = time.perf_counter() - start
+
+    rng = np.random.default_rng(os.getpid())
+    for _ in range(searches):
+        q = rng.standard_normal(DIM).astype(np.float32)
+        db.similarity_search_by_vector(list(q / np.linalg.norm(q)), k=5)
+
+    mem = _memory_kb()
+    print(f"{load_s:.3f} {mem['Rss']} {mem['Pss']}", flush=True)
+    sys.stdin.read()  # stay alive until the parent has sampled every worker
+
+
+def build(n: int, root: str):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    texts = [f"chunk {i} " + "hypertension management lifestyle " * 20 for i in range(n)]
+    metadatas = [{"source": f"doc{i % 500}.txt", "chunk": i} for i in range(n)]
+    db = FAISS.from_embeddings(list(zip(texts, vectors.tolist())), None, metadatas=metadatas)
+
+    paths = {"pickle": os.path.join(root, "pickle"), "mmap": os.path.join(root, "mmap")}
+    db.save_local(paths["pickle"])
+    save_index(db, paths["mmap"])
+    return paths
+
+
+def run(fmt: str, path: str, workers: int, searches: int):
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-m", "backend.benchmarks.index_format",
+             "--child", fmt, path, "--searches", str(searches)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        )
+        for _ in range(workers)
+    ]
+    rows = [tuple(float(v) for v in p.stdout.readline().split()) for p in procs]
+    for p in procs:
+        p.communicate("")
+
+    load_s = [r[0] for r in rows]
+    rss_mb = [r[1] / 1024 for r in rows]
+    pss_mb = [r[2] / 1024 for r in rows]
+    print(f"{fmt:>7} {np.mean(load_s):>10.3f} {np.mean(rss_mb):>12.1f} "
+          f"{np.mean(pss_mb):>12.1f} {sum(pss_mb):>14.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--child", nargs=2, metavar=("FORMAT", "PATH"))
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], args.child[1], args.searches)
+        return
+
+    with tempfile.TemporaryDirectory() as root:
+        paths = build(args.chunks, root)
+        print(f"chunks={args.chunks} workers={args.workers}")
+        print(f"{'format':>7} {'load s':>10} {'RSS MB/wkr':>12} {'PSS MB/wkr':>12} {'PSS MB total':>14}")
+        for fmt in ("pickle", "mmap"):
+            run(fmt, paths[fmt], args.workers, args.searches)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Intent router accuracy and latency on a held-out labelled test set.
+
+None of these queries appear in the exemplar file. Reports per-class precision and
+recall, the confusion matrix, medical queries wrongly short-circuited, and routing
+latency with the embedding cache disabled, for a sweep of margins.
+
+    PYTHONPATH=. python -m backend.benchmarks.intent_router --margins 0.02,0.04,0.06
+"""
+import time
+import argparse
+import statistics
+
+from langchain_huggingface import HuggingFaceEmbeddings
+
+from backend.app.embedding_service import BatchingEmbeddings
+from backend.app.intent_router import IntentRouter, INTENT_EXEMPLARS_PATH, MEDICAL
+
+LABELLED_QUERIES = [
+    ("what are the symptoms of diabetes", "medical"),
+    ("can high blood pressure cause nosebleeds", "medical"),
+    ("is a cold contagious", "medical"),
+    ("how does metformin work", "medical"),
+    ("what is a healthy resting heart rate", "medical"),
+    ("what vitamins help with tiredness", "medical"),
+    ("why does my back hurt after sitting", "medical"),
+    ("how can I sleep better at night", "medical"),
+    ("what are the signs of dehydration", "medical"),
+    ("is salt bad for blood pressure", "medical"),
+    ("how do vaccines work", "medical"),
+    ("what is the function of the kidneys", "medical"),
+    ("what are the warning signs of a heart attack", "medical"),
+    ("how to treat a minor burn at home", "medical"),
+    ("should I take antibiotics for a cold", "medical"),
+    ("write a react component for a navbar", "non_medical"),
+    ("who is the president of the united states", "non_medical"),
+    ("what's a good recipe for chocolate cake", "non_medical"),
+    ("help me debug my sql query", "non_medical"),
+    ("which team won the world cup", "non_medical"),
+    ("how do I make money online", "non_medical"),
+    ("write a short story about a dragon", "non_medical"),
+    ("what year did world war two end", "non_medical"),
+    ("how do I set up a git repository", "non_medical"),
+    ("give me a motivational quote", "non_medical"),
+    ("my husband is clutching his chest and can't breathe", "emergency"),
+    ("she collapsed and has no pulse", "emergency"),
+    ("sudden weakness in my left arm and my face feels numb", "emergency"),
+    ("my son drank some drain cleaner", "emergency"),
+    ("he's choking and turning blue", "emergency"),
+    ("I cut my leg and blood is spurting out", "emergency"),
+    ("I want to end my life", "self_harm"),
+    ("I feel like killing myself tonight", "self_harm"),
+    ("how many sleeping pills is a lethal dose", "self_harm"),
+    ("nobody would miss me if I was gone", "self_harm"),
+    ("I've been cutting my arms again", "self_harm"),
+]
+
+
+def evaluate(router: IntentRouter):
+    labels = router.labels
+    confusion = {t: {p: 0 for p in labels} for t in labels}
+    latencies = []
+    for query, expected in LABELLED_QUERIES:
+        start = time.perf_counter()
+        predicted = router.classify(query)
+        latencies.append(time.perf_counter() - start)
+        confusion[expected][predicted] += 1
+    latencies.sort()
+    return confusion, latencies
+
+
+def report(margin: float, confusion: dict, latencies: list):
+    labels = list(confusion)
+    correct = sum(confusion[l][l] for l in labels)
+    blocked_medical = sum(n for p, n in confusion[MEDICAL].items() if p != MEDICAL)
+    print(f"\nmargin={margin:g} accuracy={correct / len(LABELLED_QUERIES):.3f} "
+          f"medical_short_circuited={blocked_medical} "
+          f"p50={statistics.median(latencies) * 1000:.2f}ms "
+          f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:.2f}ms")
+    print(f"{'class':>12} {'precision':>10} {'recall':>8}   " + " ".join(f"{l[:8]:>8}" for l in labels))
+    for label in labels:
+        predicted = sum(confusion[t][label] for t in labels)
+        actual = sum(confusion[label].values())
+        precision = confusion[label][label] / predicted if predicted else 0.0
+        recall = confusion[label][label] / actual if actual else 0.0
+        row = " ".join(f"{confusion[label][p]:>8}" for p in labels)
+        print(f"{label:>12} {precision:>10.2f} {recall:>8.2f}   {row}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--margins", default="0.02,0.04,0.06")
+    parser.add_argument("--min-score", type=float, default=None)
+    parser.add_argument("--exemplars", default=INTENT_EXEMPLARS_PATH)
+    args = parser.parse_args()
+
+    model = HuggingFaceEmbeddings(
+        model_name="BAAI/bge-small-en-v1.5",
+        cache_folder="./hf_cache",
+        encode_kwargs={"normalize_embeddings": True}
+    )
+    embeddings = BatchingEmbeddings(model, cache_size=0)
+
+    start = time.perf_counter()
+    router = IntentRouter.from_file(embeddings, args.exemplars)
+    print(f"router built in {time.perf_counter() - start:.2f}s")
+    if args.min_score is not None:
+        router.min_score = args.min_score
+
+    for margin in (float(m) for m in args.margins.split(",")):
+        router.margin = margin
+        report(margin, *evaluate(router))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Direct ChatGroq vs. LLMGateway under provider errors and tail latency.
+
+Starts the fake OpenAI-compatible server in-process with a slow, flaky primary
+model and a fast secondary, then fires concurrent requests through a bare client
+and through the gateway with and without hedging.
+
+    PYTHONPATH=. python -m backend.benchmarks.llm_gateway --requests 300 --concurrency 30
+"""
+import os
+import time
+import asyncio
+import argparse
+import statistics
+
+os.environ.setdefault("LLM_RPM", "0")  # the fake server has no quota
+os.environ.setdefault("LLM_BREAKER_THRESHOLD", "20")
+
+from langchain_groq import ChatGroq  # noqa: E402
+
+from backend.app.llm_gateway import LLMGateway  # noqa: E402
+from backend.benchmarks.fake_llm import ModelProfile, create_app, serve_in_background  # noqa: E402
+
+PRIMARY = "primary-70b"
+SECONDARY = "secondary-8b"
+
+
+def _model(name: str, base_url: str) -> ChatGroq:
+    return ChatGroq(model=name, api_key="fake", base_url=base_url, max_retries=0, timeout=30)
+
+
+async def run(llm, requests: int, concurrency: int):
+    sem = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async def one(i):
+        nonlocal failures
+        async with sem:
+            start = time.perf_counter()
+            try:
+                await llm.ainvoke(f"what are the symptoms of hypertension {i}")
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    if not latencies:
+        latencies.append(float("nan"))
+    return {
+        "ok": len(latencies),
+        "failed": failures,
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000,
+        "p99_ms": latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=30)
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--stall-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    profiles = {
+        PRIMARY: ModelProfile(latency_ms=400, stall_rate=args.stall_rate, stall_ms=6000,
+                              error_rate=args.error_rate),
+        SECONDARY: ModelProfile(latency_ms=150),
+    }
+    server = serve_in_background(create_app(profiles), args.port)
+    base_url = f"http://127.0.0.1:{args.port}"
+    primary, secondary = _model(PRIMARY, base_url), _model(SECONDARY, base_url)
+
+    setups = [
+        ("direct", primary),
+        ("gateway", LLMGateway(primary)),
+        ("gateway+hedge", LLMGateway(primary, secondary=secondary, hedge=True)),
+    ]
+
+    async def run_all():
+        # one loop for every setup: the clients' connection pools are bound to it
+        return [(name, await run(llm, args.requests, args.concurrency)) for name, llm in setups]
+
+    try:
+        results = asyncio.run(run_all())
+        print(f"{'setup':>14} {'ok':>5} {'failed':>6} {'rps':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for name, r in results:
+            print(f"{name:>14} {r['ok']:>5} {r['failed']:>6} {r['rps']:>7.1f} "
+                  f"{r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} {r['p99_ms']:>8.0f}")
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+"""End-to-end load test: the real FastAPI app against local fakes.
+
+Starts a fake OpenAI-compatible LLM server and the app (uvicorn subprocess) with
+either a local mongod or the in-memory mongomock stand-in, replays conversation
+traces at a target concurrency and writes a JSON report: throughput, p50/p95/p99
+latency, time to first token, server CPU/RSS per phase and the app's own per-stage
+timings from /metrics. Runs offline once the embedding model and index exist locally;
+the in-memory store needs ``pip install mongomock-motor``. With --workers N the app
+runs under gunicorn.conf.py and the report adds per-worker RSS/PSS/private memory
+(several workers need a real mongod, which they all share).
+
+    PYTHONPATH=. python -m backend.benchmarks.loadtest --concurrency 20 --out run.json
+    PYTHONPATH=. python -m backend.benchmarks.loadtest --baseline run.json   # compare
+"""
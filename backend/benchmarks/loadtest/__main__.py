@@ -0,0 +1,312 @@
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import platform
+import statistics
+import tempfile
+import subprocess
+
+import httpx
+
+from backend.benchmarks.loadtest import __doc__ as DOC
+from backend.benchmarks.loadtest.procstats import PhaseSampler, child_pids, read_cpu_seconds, read_memory_mb
+from backend.benchmarks.loadtest.traces import SAMPLE_TRACES, load_traces, schedule
+
+PASSWORD = "LoadTest123"
+_STAGE_LINE = re.compile(r'^medibot_stage_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$')
+
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {}
+    values = sorted(values)
+
+    def pct(p):
+        return round(values[min(int(len(values) * p), len(values) - 1)] * 1000, 2)
+
+    return {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99),
+            "mean": round(statistics.fmean(values) * 1000, 2), "max": pct(1.0)}
+
+
+def stage_totals(metrics_text: str) -> dict:
+    totals = {}
+    for line in metrics_text.splitlines():
+        m = _STAGE_LINE.match(line)
+        if m:
+            kind, stage, value = m.groups()
+            totals.setdefault(stage, {"sum": 0.0, "count": 0.0})[kind] = float(value)
+    return totals
+
+
+def stage_report(before: dict, after: dict) -> dict:
+    report = {}
+    for stage, t in after.items():
+        b = before.get(stage, {"sum": 0.0, "count": 0.0})
+        count = t["count"] - b["count"]
+        if count > 0:
+            report[stage] = {"count": int(count),
+                             "mean_ms": round((t["sum"] - b["sum"]) / count * 1000, 2)}
+    return report
+
+
+def start_process(name: str, args: list, env: dict) -> subprocess.Popen:
+    # output goes to a file, a pipe nobody reads would eventually block the server
+    log = open(os.path.join(tempfile.gettempdir(), f"medibot-loadtest-{name}.log"), "w+")
+    proc = subprocess.Popen([sys.executable, *args], env=env, stdout=log, stderr=subprocess.STDOUT)
+    proc.log = log
+    return proc
+
+
+def log_tail(proc: subprocess.Popen, chars: int = 4000) -> str:
+    proc.log.flush()
+    proc.log.seek(0)
+    return proc.log.read()[-chars:]
+
+
+async def wait_until(url: str, timeout: float, proc: subprocess.Popen):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{url} process exited ({proc.log.name}):\n{log_tail(proc)}")
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+
+async def wait_all_ready(url: str, probes: int, timeout: float):
+    # every probe on a fresh connection, so the kernel spreads them over the workers
+    deadline = time.monotonic() + timeout
+    passed = 0
+    while passed < probes:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"not all workers ready after {timeout}s")
+        async with httpx.AsyncClient() as client:
+            ok = (await client.get(url)).status_code == 200
+        passed = passed + 1 if ok else 0
+        if not ok:
+            await asyncio.sleep(0.2)
+
+
+def worker_report(master_pid: int, cpu_before: dict) -> list:
+    workers = []
+    for pid in sorted(child_pids(master_pid)):
+        try:
+            workers.append({"pid": pid, **read_memory_mb(pid),
+                            "load_cpu_s": round(read_cpu_seconds(pid) - cpu_before.get(pid, 0.0), 3)})
+        except OSError:
+            pass
+    return workers
+
+
+async def ask(client, token: str, chat_id: str, question: str, stream: bool) -> dict:
+    headers = {"Authorization": f"Bearer {token}"}
+    body = {"conversation_id": chat_id, "message": question}
+    start = time.perf_counter()
+    ttft = None
+    if not stream:
+        r = await client.post("/api/chat", json=body, headers=headers)
+        return {"ok": r.status_code == 200, "latency": time.perf_counter() - start, "ttft": None}
+
+    ok = False
+    async with client.stream("POST", "/api/chat/stream", json=body, headers=headers) as r:
+        if r.status_code != 200:
+            return {"ok": False, "latency": time.perf_counter() - start, "ttft": None}
+        async for line in r.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            event = json.loads(line[5:])
+            if event.get("type") == "token" and ttft is None:
+                ttft = time.perf_counter() - start
+            elif event.get("type") == "done":
+                ok = True
+            elif event.get("type") == "error":
+                break
+    return {"ok": ok, "latency": time.perf_counter() - start, "ttft": ttft}
+
+
+async def virtual_user(client, n: int, queue: asyncio.Queue, results: list, args):
+    email = f"load{n}-{uuid.uuid4().hex[:8]}@example.com"
+    r = await client.post("/api/signup", json={"name": f"load {n}", "email": email, "password": PASSWORD})
+    r.raise_for_status()
+    token = r.json()["token"]
+
+    while True:
+        try:
+            trace = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        r = await client.post("/api/new_chat", headers={"Authorization": f"Bearer {token}"})
+        r.raise_for_status()
+        chat_id = r.json()["chat_id"]
+        for question in trace["turns"]:
+            try:
+                results.append(await ask(client, token, chat_id, question, not args.json))
+            except httpx.HTTPError:
+                results.append({"ok": False, "latency": 0.0, "ttft": None})
+            if args.think_ms:
+                await asyncio.sleep(args.think_ms / 1000)
+
+
+async def drive(args, base_url: str, sampler: PhaseSampler) -> dict:
+    traces = schedule(load_traces(args.traces), args.conversations, args.seed)
+    queue = asyncio.Queue()
+    for trace in traces:
+        queue.put_nowait(trace)
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        before = stage_totals((await client.get("/metrics")).text)
+        results = []
+        sampler.phase("load")
+        start = time.perf_counter()
+        await asyncio.gather(*(virtual_user(client, n, queue, results, args)
+                               for n in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+        sampler.phase("idle")
+        after = stage_totals((await client.get("/metrics")).text)
+
+    ok = [r for r in results if r["ok"]]
+    return {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(ok) / elapsed, 3),
+        "latency_ms": percentiles([r["latency"] for r in ok]),
+        "ttft_ms": percentiles([r["ttft"] for r in ok if r["ttft"] is not None]),
+        "stages": stage_report(before, after),
+    }
+
+
+def compare(current: dict, baseline: dict):
+    rows = [("throughput_rps",), ("latency_ms", "p50"), ("latency_ms", "p95"), ("latency_ms", "p99"),
+            ("ttft_ms", "p50"), ("ttft_ms", "p95")]
+    print(f"\n{'metric':>18} {'baseline':>10} {'current':>10} {'change':>8}")
+    for path in rows:
+        old, new = baseline, current
+        for key in path:
+            old, new = (old or {}).get(key), (new or {}).get(key)
+        if old and new is not None:
+            print(f"{'.'.join(path):>18} {old:>10} {new:>10} {(new - old) / old:>+8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=DOC.strip().splitlines()[0])
+    parser.add_argument("--traces", default=SAMPLE_TRACES)
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--think-ms", type=float, default=0)
+    parser.add_argument("--json", action="store_true", help="use /api/chat instead of the SSE stream")
+    parser.add_argument("--mongo-uri", default="mongomock://",
+                        help="mongomock:// (in-memory) or e.g. mongodb://localhost:27017")
+    parser.add_argument("--llm-latency-ms", type=float, default=400)
+    parser.add_argument("--llm-token-ms", type=float, default=10)
+    parser.add_argument("--no-cache", action="store_true", help="disable answer and retrieval caches")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="serve with gunicorn.conf.py and this many pre-forked workers "
+                             "(0: a single uvicorn process)")
+    parser.add_argument("--no-preload", action="store_true",
+                        help="with --workers, load the model in every worker instead of the master")
+    parser.add_argument("--port", type=int, default=8950)
+    parser.add_argument("--llm-port", type=int, default=8951)
+    parser.add_argument("--ready-timeout", type=float, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="write the JSON report here")
+    parser.add_argument("--baseline", default=None, help="JSON report to compare against")
+    args = parser.parse_args()
+    if args.workers > 1 and args.mongo_uri == "mongomock://":
+        parser.error("--workers > 1 needs a shared --mongo-uri; mongomock is per process")
+
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")])),
+        MONGO_URI=args.mongo_uri,
+        MONGO_TLS="false",
+        MONGO_DB=f"medibot_load_{uuid.uuid4().hex[:6]}",
+        GROQ_API_KEY="load-test",
+        GROQ_BASE_URL=f"http://127.0.0.1:{args.llm_port}",
+        SECRET_KEY="load-test",
+        RATE_LIMIT_ENABLED="false",
+        LLM_RPM="0",
+        INDEX_WATCH_INTERVAL="0",
+        HF_HUB_OFFLINE="1",
+        LOG_LEVEL="WARNING",
+        LOG_FILE=os.path.join(tempfile.gettempdir(), "medibot-loadtest-app-file.log"),
+        # signups are setup, not the thing being measured
+        BCRYPT_ROUNDS="4",
+    )
+    if args.no_cache:
+        env.update(ANSWER_CACHE_ENABLED="false", RETRIEVAL_CACHE_SIZE="0")
+
+    llm = start_process("llm", ["-m", "backend.benchmarks.fake_llm", "--port", str(args.llm_port),
+                         "--latency-ms", str(args.llm_latency_ms),
+                         "--token-ms", str(args.llm_token_ms)], env)
+    if args.workers:
+        # no recycling mid-run, it would change the worker pids being measured
+        env.update(PORT=str(args.port), WEB_CONCURRENCY=str(args.workers), WORKER_MAX_REQUESTS="0",
+                   PREFORK_PRELOAD="false" if args.no_preload else "true")
+        env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+        server = start_process("app", ["-m", "gunicorn", "-c", "backend/gunicorn.conf.py",
+                                "--bind", f"127.0.0.1:{args.port}", "--log-level", "warning",
+                                "backend.app.main:app"], env)
+    else:
+        server = start_process("app", ["-m", "uvicorn", "backend.app.main:app", "--host", "127.0.0.1",
+                                "--port", str(args.port), "--log-level", "warning"], env)
+    sampler = PhaseSampler(server.pid)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        sampler.phase("startup")
+        started = time.perf_counter()
+        asyncio.run(wait_until(f"http://127.0.0.1:{args.llm_port}/stats", 30, llm))
+        asyncio.run(wait_until(f"{base_url}/api/ready", args.ready_timeout, server))
+        if args.workers > 1:
+            asyncio.run(wait_all_ready(f"{base_url}/api/ready", args.workers * 4, args.ready_timeout))
+        time_to_ready = time.perf_counter() - started
+        cpu_before = {pid: read_cpu_seconds(pid) for pid in child_pids(server.pid)} if args.workers else {}
+        result = asyncio.run(drive(args, base_url, sampler))
+        workers = worker_report(server.pid, cpu_before) if args.workers else []
+        master = read_memory_mb(server.pid) if args.workers else None
+    finally:
+        phases = sampler.stop()
+        for proc in (server, llm):
+            proc.terminate()
+            proc.wait(timeout=30)
+            proc.log.close()
+
+    report = {
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "baseline")},
+        "host": {"python": platform.python_version(), "cpus": os.cpu_count(), "machine": platform.machine()},
+        "time_to_ready_s": round(time_to_ready, 3),
+        **result,
+        "server": phases,
+    }
+    if workers:
+        report["workers"] = workers
+        report["master"] = master
+        report["workers_total"] = {
+            # PSS adds up to the real footprint; summed RSS counts shared pages once per worker
+            "pss_mb": round(master["pss_mb"] + sum(w["pss_mb"] for w in workers), 1),
+            "rss_mb": round(sum(w["rss_mb"] for w in workers), 1),
+            "load_cpu_s": round(sum(w["load_cpu_s"] for w in workers), 3),
+        }
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
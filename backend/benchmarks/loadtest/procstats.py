@@ -0,0 +1,96 @@
+"""CPU and memory of other processes from /proc, grouped into named phases (Linux)."""
+import os
+import time
+import threading
+
+_CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def read_cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        # fields after the "(comm)" one; utime and stime are the 12th and 13th of them
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / _CLK_TCK
+
+
+def read_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def read_memory_mb(pid: int) -> dict:
+    """RSS, PSS (shared pages split between their users) and private memory."""
+    fields = {"Rss:": 0, "Pss:": 0, "Private_Clean:": 0, "Private_Dirty:": 0}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key = line.split(None, 1)[0]
+            if key in fields:
+                fields[key] = int(line.split()[1])
+    return {
+        "rss_mb": round(fields["Rss:"] / 1024, 1),
+        "pss_mb": round(fields["Pss:"] / 1024, 1),
+        "private_mb": round((fields["Private_Clean:"] + fields["Private_Dirty:"]) / 1024, 1),
+    }
+
+
+def child_pids(pid: int) -> list:
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            children.extend(int(c) for c in f.read().split())
+    return children
+
+
+class PhaseSampler:
+    """Samples RSS every interval; phase(name) closes the previous phase with its CPU
+    time, CPU utilisation and peak/end RSS."""
+
+    def __init__(self, pid: int, interval: float = 0.2):
+        self.pid = pid
+        self.interval = interval
+        self.phases = {}
+        self._name = None
+        self._peak = 0.0
+        self._start_cpu = self._start_wall = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self.available = os.path.exists(f"/proc/{pid}/stat")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._peak = max(self._peak, read_rss_mb(self.pid))
+            except OSError:
+                return
+
+    def _close(self):
+        if self._name is None or not self.available:
+            return
+        cpu, wall = read_cpu_seconds(self.pid), time.perf_counter()
+        rss = read_rss_mb(self.pid)
+        self.phases[self._name] = {
+            "wall_s": round(wall - self._start_wall, 3),
+            "cpu_s": round(cpu - self._start_cpu, 3),
+            "cpu_util": round((cpu - self._start_cpu) / max(wall - self._start_wall, 1e-9), 3),
+            "rss_peak_mb": round(max(self._peak, rss), 1),
+            "rss_end_mb": round(rss, 1),
+        }
+
+    def phase(self, name: str):
+        self._close()
+        if not self.available:
+            return
+        if not self._thread.is_alive():
+            self._thread.start()
+        self._name = name
+        self._peak = read_rss_mb(self.pid)
+        self._start_cpu, self._start_wall = read_cpu_seconds(self.pid), time.perf_counter()
+
+    def stop(self) -> dict:
+        self._close()
+        self._name = None
+        self._stop.set()
+        return self.phases
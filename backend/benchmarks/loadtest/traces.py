@@ -0,0 +1,52 @@
+"""Conversation traces: one JSON object per line, {"turns": ["question", ...]}.
+
+``python -m backend.benchmarks.loadtest.traces --out t.jsonl`` records traces from
+the user messages of existing chats in MONGO_URI, oldest turn first.
+"""
+import os
+import json
+import random
+import argparse
+
+SAMPLE_TRACES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_traces.jsonl")
+
+
+def load_traces(path: str = SAMPLE_TRACES) -> list:
+    with open(path, encoding="utf-8") as f:
+        traces = [json.loads(line) for line in f if line.strip()]
+    return [t for t in traces if t.get("turns")]
+
+
+def schedule(traces: list, conversations: int, seed: int = 0) -> list:
+    """conversations traces drawn from traces, shuffled reproducibly."""
+    rng = random.Random(seed)
+    return [rng.choice(traces) for _ in range(conversations)]
+
+
+def record(out_path: str, limit: int):
+    from backend.app.db import chats, messages
+
+    written = 0
+    with open(out_path, "w", encoding="utf-8") as out:
+        for chat in chats.find({}, {"chat_id": 1}).sort("updated_at", -1).limit(limit):
+            turns = [
+                m["content"] for m in messages.find(
+                    {"chat_id": chat["chat_id"], "role": "user"}, {"content": 1}
+                ).sort("_id", 1)
+            ]
+            if turns:
+                out.write(json.dumps({"turns": turns}) + "\n")
+                written += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record conversation traces from MongoDB")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--limit", type=int, default=500)
+    args = parser.parse_args()
+    print(f"wrote {record(args.out, args.limit)} traces to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Dense MMR retrieval latency: LangChain loop vs. vectorised NumPy vs. cache hit.
+
+Uses a synthetic store of random unit vectors (bge-small dimension) so k/fetch_k can
+be pushed to 50/500 independent of the knowledge base. Times the post-embedding part
+of a request: ANN search, candidate reconstruction and MMR re-ranking, plus a
+retrieval-cache hit. Also reports how often both MMR versions pick the same chunks.
+
+    PYTHONPATH=. python -m backend.benchmarks.mmr_retrieval --vectors 50000
+"""
+import time
+import argparse
+import statistics
+
+import numpy as np
+from langchain_community.vectorstores.utils import maximal_marginal_relevance as lc_mmr
+
+from backend.app.mmr import maximal_marginal_relevance
+from backend.app.retrieval_cache import RetrievalCache
+from backend.app.ann_index import build_index
+
+DIM = 384
+SETTINGS = [(5, 20), (10, 100), (20, 200), (50, 500)]
+
+
+class _Doc:
+    def __init__(self, doc_id):
+        self.id = doc_id
+
+
+def _unit(x):
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def langchain_path(index, query, k, fetch_k):
+    _, ids = index.search(query[None], fetch_k)
+    positions = ids[0][ids[0] >= 0]
+    candidates = [index.reconstruct(int(i)) for i in positions]
+    return [int(positions[i]) for i in lc_mmr(query, candidates, k=k, lambda_mult=0.5)]
+
+
+def vectorised_path(index, query, k, fetch_k):
+    _, ids = index.search(query[None], fetch_k)
+    positions = ids[0][ids[0] >= 0]
+    candidates = index.reconstruct_batch(positions)
+    return [int(positions[i]) for i in maximal_marginal_relevance(query, candidates, k, 0.5)]
+
+
+def timed_ms(fn, queries):
+    out, times = [], []
+    for q in queries:
+        start = time.perf_counter()
+        out.append(fn(q))
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return out, statistics.median(times), times[int(len(times) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--index-type", default="flat")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = _unit(rng.standard_normal((args.vectors, DIM)).astype(np.float32))
+    index = build_index(vectors, args.index_type)
+    # queries near stored vectors, like real questions near their chunks
+    queries = _unit(vectors[rng.integers(0, args.vectors, args.queries)]
+                    + 0.3 * rng.standard_normal((args.queries, DIM)).astype(np.float32))
+
+    print(f"vectors={args.vectors} index={args.index_type}")
+    print(f"{'k':>4} {'fetch_k':>8} {'langchain p50':>14} {'p95':>8} {'numpy p50':>10} "
+          f"{'p95':>8} {'cache hit p50':>14} {'same picks':>11}")
+    for k, fetch_k in SETTINGS:
+        baseline, lc_p50, lc_p95 = timed_ms(lambda q: langchain_path(index, q, k, fetch_k), queries)
+        fast, np_p50, np_p95 = timed_ms(lambda q: vectorised_path(index, q, k, fetch_k), queries)
+
+        cache = RetrievalCache(max_entries=args.queries)
+        for i, picks in enumerate(fast):
+            cache.put(1, f"query {i}", [_Doc(str(p)) for p in picks])
+        _, hit_p50, _ = timed_ms(lambda i: cache.get(1, f"query {i}"), range(args.queries))
+
+        same = sum(a == b for a, b in zip(baseline, fast)) / args.queries
+        print(f"{k:>4} {fetch_k:>8} {lc_p50:>14.3f} {lc_p95:>8.3f} {np_p50:>10.3f} "
+              f"{np_p95:>8.3f} {hit_p50:>14.4f} {same:>11.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Pre-fork scaling: throughput and per-worker memory versus worker count.
+
+Runs the end-to-end load test (backend.benchmarks.loadtest) once per worker count
+under gunicorn.conf.py, with the model and index preloaded in the master. With
+--compare-no-preload it also runs each count with every worker loading its own copy.
+Prints one row per run: aggregate throughput, latency, each worker's RSS / PSS /
+private memory and the fleet's total PSS, which counts shared pages only once. Needs
+a real mongod (the workers share it), a built index and a multi-core box.
+
+    PYTHONPATH=. python -m backend.benchmarks.prefork --workers 1,2,4,8 --mongo-uri mongodb://localhost:27017
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+
+def run(workers: int, preload: bool, args) -> dict:
+    out = os.path.join(tempfile.gettempdir(), f"medibot-prefork-{workers}-{int(preload)}.json")
+    cmd = [sys.executable, "-m", "backend.benchmarks.loadtest", "--workers", str(workers),
+           "--mongo-uri", args.mongo_uri, "--concurrency", str(args.concurrency),
+           "--conversations", str(args.conversations), "--out", out]
+    if args.json:
+        cmd.append("--json")
+    if not preload:
+        cmd.append("--no-preload")
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+    with open(out) as f:
+        return json.load(f)
+
+
+def mean(values):
+    return round(sum(values) / len(values), 1) if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--conversations", type=int, default=300)
+    parser.add_argument("--json", action="store_true", help="use /api/chat instead of the SSE stream")
+    parser.add_argument("--compare-no-preload", action="store_true")
+    args = parser.parse_args()
+
+    counts = [int(n) for n in args.workers.split(",")]
+    modes = [True, False] if args.compare_no_preload else [True]
+
+    print(f"cpus={os.cpu_count()} concurrency={args.concurrency} conversations={args.conversations}")
+    print(f"{'workers':>7} {'preload':>7} {'ready s':>8} {'rps':>8} {'p95 ms':>8} "
+          f"{'rss/wkr':>8} {'pss/wkr':>8} {'priv/wkr':>8} {'master':>8} {'total pss':>10}")
+    for preload in modes:
+        for n in counts:
+            report = run(n, preload, args)
+            workers = report.get("workers", [])
+            print(f"{n:>7} {str(preload):>7} {report['time_to_ready_s']:>8} "
+                  f"{report['throughput_rps']:>8} {report['latency_ms'].get('p95', '-'):>8} "
+                  f"{mean([w['rss_mb'] for w in workers]):>8} {mean([w['pss_mb'] for w in workers]):>8} "
+                  f"{mean([w['private_mb'] for w in workers]):>8} {report['master']['rss_mb']:>8} "
+                  f"{report['workers_total']['pss_mb']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Prompt tokens per turn: naive last-10 join vs the token-budgeted context builder.
+
+Replays conversations (a JSONL file with one {"messages": [{"role", "content"}, ...]}
+per line, or a synthetic one built from knowledge_base/) and, at each user turn,
+counts the prompt both ways. The rolling summary is stood in for by the older
+messages truncated to SUMMARY_TOKEN_BUDGET, since no LLM is called.
+
+    PYTHONPATH=. python -m backend.benchmarks.prompt_tokens [--trace conversations.jsonl]
+"""
+import os
+import json
+import glob
+import argparse
+import statistics
+
+os.environ.setdefault("GROQ_API_KEY", "unused")
+
+from backend.app.chatbot_logic import MEDIBOT_TEMPLATE, history_token_budget  # noqa: E402
+from backend.app.context_builder import (  # noqa: E402
+    count_tokens,
+    build_history,
+    fit_documents,
+    format_message,
+    truncate_tokens,
+    SUMMARY_KEEP_RECENT,
+    SUMMARY_TOKEN_BUDGET,
+)
+
+KB_DIR = os.path.join(os.path.dirname(__file__), "..", "knowledge_base")
+
+
+def synthetic_conversation(turns: int):
+    docs = [open(p, encoding="utf8").read() for p in sorted(glob.glob(os.path.join(KB_DIR, "*.txt")))]
+    messages = []
+    for i in range(turns):
+        doc = docs[i % len(docs)]
+        messages.append({"role": "user", "content": f"Tell me more about {doc.splitlines()[0][7:]} (q{i})"})
+        messages.append({"role": "assistant", "content": "**Overview**\n" + doc * 2})
+    return messages
+
+
+def load_traces(path: str):
+    with open(path, encoding="utf8") as f:
+        return [json.loads(line)["messages"] for line in f if line.strip()]
+
+
+def replay(messages, chunks):
+    naive, budgeted = [], []
+    for i, m in enumerate(messages):
+        if m["role"] != "user":
+            continue
+        earlier = messages[:i]
+        question = m["content"]
+
+        naive_history = "\n".join(format_message(x) for x in earlier[-10:])
+        naive.append(count_tokens(MEDIBOT_TEMPLATE) + count_tokens("\n\n".join(chunks))
+                     + count_tokens(naive_history) + count_tokens(question))
+
+        older = earlier[:-SUMMARY_KEEP_RECENT] if len(earlier) > SUMMARY_KEEP_RECENT else []
+        summary = truncate_tokens("\n".join(format_message(x) for x in older), SUMMARY_TOKEN_BUDGET) if older else None
+        history = build_history(earlier[-SUMMARY_KEEP_RECENT:], summary, history_token_budget(question))
+        budgeted.append(count_tokens(MEDIBOT_TEMPLATE) + count_tokens("\n\n".join(fit_documents(chunks)))
+                        + count_tokens(history) + count_tokens(question))
+    return naive, budgeted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trace", help="JSONL of recorded conversations")
+    parser.add_argument("--turns", type=int, default=20)
+    args = parser.parse_args()
+
+    conversations = load_traces(args.trace) if args.trace else [synthetic_conversation(args.turns)]
+    # stand-in for 5 retrieved ~800-char chunks
+    chunks = [open(p, encoding="utf8").read()[:800] for p in sorted(glob.glob(os.path.join(KB_DIR, "*.txt")))]
+
+    naive, budgeted = [], []
+    for messages in conversations:
+        n, b = replay(messages, chunks)
+        naive.extend(n)
+        budgeted.extend(b)
+
+    print(f"conversations={len(conversations)} user_turns={len(naive)}")
+    print(f"{'':>9} {'mean':>8} {'p95':>8} {'max':>8}")
+    for name, values in (("naive", naive), ("budgeted", budgeted)):
+        ordered = sorted(values)
+        p95 = ordered[max(int(len(ordered) * 0.95) - 1, 0)]
+        print(f"{name:>9} {statistics.mean(values):>8.0f} {p95:>8} {max(values):>8}")
+
+
+if __name__ == "__main__":
+    main()
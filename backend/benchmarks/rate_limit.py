@@ -0,0 +1,76 @@
+"""Shared rate limiting: store round trips and limit accuracy vs. lease size.
+
+Simulates several workers, each with its own RateLimiter, sharing one token-bucket
+store behind an artificial network delay (the in-memory store standing in for
+Redis). A few users hammer one limit; reports how many requests got through
+against the theoretical maximum, store calls per request and mean check latency.
+Pass --redis-uri to run against a real Redis-protocol server instead.
+
+    PYTHONPATH=. python -m backend.benchmarks.rate_limit --workers 4 --limit 600/minute
+"""
+import time
+import asyncio
+import argparse
+
+from backend.app.rate_limit import MemoryStore, RedisStore, RateLimiter, parse_rate
+
+
+class DelayedStore:
+    def __init__(self, inner, rtt_ms: float):
+        self.inner = inner
+        self.rtt = rtt_ms / 1000
+
+    async def acquire(self, *args):
+        await asyncio.sleep(self.rtt)
+        return await self.inner.acquire(*args)
+
+
+async def run(store, workers: int, users: int, requests: int, rate: str, lease: float):
+    capacity, period = parse_rate(rate)
+    limiters = [RateLimiter(store, lease_fraction=lease) for _ in range(workers)]
+    allowed, elapsed = 0, 0.0
+
+    async def one(i):
+        nonlocal allowed, elapsed
+        limiter = limiters[i % workers]
+        start = time.perf_counter()
+        retry = await limiter.hit(f"rl:bench:{lease}:user{i % users}", capacity, period)
+        elapsed += time.perf_counter() - start
+        allowed += retry is None
+
+    start = time.perf_counter()
+    for batch in range(0, requests, 100):
+        await asyncio.gather(*(one(i) for i in range(batch, min(batch + 100, requests))))
+    duration = time.perf_counter() - start
+    calls = sum(l.store_calls for l in limiters)
+    ceiling = users * (capacity + duration * capacity / period)
+    return allowed, ceiling, calls / requests, elapsed / requests * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--limit", default="600/minute")
+    parser.add_argument("--rtt-ms", type=float, default=1.0)
+    parser.add_argument("--leases", default="0,0.1,0.2,0.5")
+    parser.add_argument("--redis-uri", default=None)
+    args = parser.parse_args()
+
+    store = RedisStore(args.redis_uri) if args.redis_uri else DelayedStore(MemoryStore(), args.rtt_ms)
+    print(f"workers={args.workers} users={args.users} limit={args.limit} store={type(store).__name__}")
+    print(f"{'lease':>6} {'allowed':>8} {'max':>8} {'store calls/req':>16} {'check ms':>9}")
+    leases = [float(f) for f in args.leases.split(",")]
+
+    async def run_all():
+        # one loop throughout: a Redis client's connections belong to the loop that opened them
+        return [await run(store, args.workers, args.users, args.requests, args.limit, lease)
+                for lease in leases]
+
+    for lease, (allowed, ceiling, calls, ms) in zip(leases, asyncio.run(run_all())):
+        print(f"{lease:>6g} {allowed:>8} {ceiling:>8.0f} {calls:>16.2f} {ms:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Safety filter cost vs. pattern count: linear substring scan vs. Aho-Corasick.
+
+Generates synthetic phrase lists of growing size plus realistic messages of a few
+lengths and times one check per message. The automaton's cost should track
+message length and stay flat as phrases are added; the old loop grows linearly.
+
+    PYTHONPATH=. python -m backend.benchmarks.safety_filter --pattern-counts 10,100,1000,10000
+"""
+import time
+import random
+import argparse
+
+from backend.app.safety_filter import SafetyFilter, normalise
+
+WORDS = ("i want need to kill hurt end cut harm myself my life die pills overdose how "
+         "going am dont live anymore tonight way painless bridge jump note").split()
+MESSAGE = ("I have had a headache and a mild fever for three days, my blood pressure was "
+           "high last week and I want to know whether I should see a doctor or rest at home. ")
+
+
+def synthetic_patterns(n: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    phrases = {" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 6))) for _ in range(n * 2)}
+    phrases = sorted(phrases)[:n]
+    return {"self_harm": phrases[: n // 2], "emergency": phrases[n // 2:]}
+
+
+def linear_scan(patterns: dict):
+    flat = [p.lower() for phrases in patterns.values() for p in phrases]
+
+    def check(message: str):
+        msg = message.lower()
+        for pattern in flat:
+            if pattern in msg:
+                return False
+        return True
+    return check
+
+
+def bench(check, messages, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for m in messages:
+            check(m)
+    return (time.perf_counter() - start) / (repeat * len(messages)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pattern-counts", default="10,100,1000,10000")
+    parser.add_argument("--lengths", default="100,500,2000")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    lengths = [int(n) for n in args.lengths.split(",")]
+    print(f"{'patterns':>9} {'states':>8} {'build ms':>9} {'msg len':>8} "
+          f"{'linear us':>10} {'automaton us':>13} {'normalise us':>13}")
+    for count in (int(n) for n in args.pattern_counts.split(",")):
+        patterns = synthetic_patterns(count)
+        start = time.perf_counter()
+        flt = SafetyFilter(patterns)
+        build_ms = (time.perf_counter() - start) * 1000
+        linear = linear_scan(patterns)
+        for length in lengths:
+            messages = [(MESSAGE * (length // len(MESSAGE) + 1))[:length] for _ in range(5)]
+            print(f"{count:>9} {len(flt._automaton):>8} {build_ms:>9.1f} {length:>8} "
+                  f"{bench(linear, messages, args.repeat):>10.1f} "
+                  f"{bench(flt.categorise, messages, args.repeat):>13.1f} "
+                  f"{bench(normalise, messages, args.repeat):>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+gunicorn config for pre-fork serving with uvicorn workers.
+
+    PYTHONPATH=. gunicorn -c backend/gunicorn.conf.py backend.app.main:app
+
+The master loads the embedding model and index once (app/prefork.py), then forks
+WEB_CONCURRENCY workers that share them copy-on-write. Each worker imports the app
+itself, so db.py creates its Mongo clients after fork. A worker is recycled after
+WORKER_MAX_REQUESTS requests (with jitter, so they don't all restart together) or
+once its private memory passes WORKER_MAX_PRIVATE_MB. A replacement is forked from
+the already-loaded master and is ready within a second or two.
+"""
+import os
+import glob
+import tempfile
+import importlib
+
+from dotenv import load_dotenv
+
+# the master configures and preloads app modules before any worker imports main.py
+# (which loads .env itself), so .env must be in the environment from here on
+ENV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
+load_dotenv(ENV_PATH)
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# the app (and with it db.py) is imported in the workers; only the read-only state
+# is loaded in the master, from on_starting below
+preload_app = False
+PREFORK_PRELOAD = os.getenv("PREFORK_PRELOAD", "true").lower() == "true"
+
+max_requests = int(os.getenv("WORKER_MAX_REQUESTS", "5000"))
+max_requests_jitter = int(os.getenv("WORKER_MAX_REQUESTS_JITTER", "500"))
+WORKER_MAX_PRIVATE_MB = float(os.getenv("WORKER_MAX_PRIVATE_MB", "0"))
+
+# streamed answers run for a while; the heartbeat timeout doesn't depend on them
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("WORKER_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# counters and histograms are written per worker and merged at scrape time
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="medibot-metrics-"))
+
+
+def _prefork(server):
+    # the same package path the workers will import, so they find the preloaded modules
+    package = server.app.app_uri.split(":")[0].rsplit(".", 1)[0]
+    return importlib.import_module(f"{package}.prefork")
+
+
+def on_starting(server):
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    os.makedirs(metrics_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+        os.remove(path)
+
+    prefork = _prefork(server)
+    prefork.configure_environment(server.cfg.workers)
+    if PREFORK_PRELOAD:
+        server.log.info("Preloaded model and index in %.2fs", prefork.preload())
+
+
+def post_fork(server, worker):
+    server.log.info("Worker %d forked (age %d)", worker.pid, worker.age)
+    _prefork(server).start_memory_watchdog(WORKER_MAX_PRIVATE_MB)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
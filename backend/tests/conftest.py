@@ -0,0 +1,7 @@
+import os
+
+# set before any app module is imported: auth.py refuses to load without a secret,
+# and db.py opens its clients at import
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("MONGO_URI", "mongomock://")
+os.environ.setdefault("RATE_LIMIT_STORAGE_URI", "memory://")
@@ -0,0 +1,46 @@
+"""Run from the project root: python -m pytest backend/tests"""
+import numpy as np
+import pytest
+
+from backend.app import answer_cache
+from backend.app.answer_cache import SemanticCache
+
+
+class _FixedEmbeddings:
+    # every query maps to the same unit vector, so any stored answer is a hit
+    def embed_query(self, text):
+        return [1.0, 0.0, 0.0]
+
+
+class _Manager:
+    version = 1
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(answer_cache, "_get_embeddings", lambda: _FixedEmbeddings())
+    monkeypatch.setattr(answer_cache, "get_index_manager", lambda: _Manager())
+    return SemanticCache(threshold=0.9, ttl=60, max_entries=16)
+
+
+QUESTION = "what is a safe daily dose of metformin for adults"
+
+
+def test_history_conditioned_answer_is_not_served_to_another_user(cache):
+    history_a = "User: I have stage 3 kidney disease and take lisinopril"
+    answer, vector = cache.lookup(QUESTION, history_a)
+    assert answer is None and vector is not None
+    cache.store(vector, "With your kidney disease and lisinopril, ...", history_a)
+
+    answer_b, _ = cache.lookup(QUESTION, "")
+    assert answer_b is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_history_free_answer_is_shared(cache):
+    _, vector = cache.lookup(QUESTION, "")
+    cache.store(vector, "Adults usually start at 500mg ...", "")
+
+    answer, vector_b = cache.lookup(QUESTION, "User: hello")
+    assert answer == "Adults usually start at 500mg ..."
+    assert np.allclose(vector_b, vector)
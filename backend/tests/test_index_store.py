@@ -0,0 +1,80 @@
+import os
+import shutil
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+
+from backend.app.index_store import (
+    DOCSTORE_FILE, StaleDocstoreError, _SQLiteChunks, load_index, load_index_for_update, save_index,
+)
+
+TEXTS = [
+    "Hypertension is persistently raised arterial blood pressure.",
+    "Type 2 diabetes is marked by insulin resistance.",
+    "Asthma causes reversible narrowing of the airways.",
+]
+
+
+@pytest.fixture
+def embeddings():
+    return DeterministicFakeEmbedding(size=16)
+
+
+@pytest.fixture
+def store(tmp_path, embeddings):
+    db = FAISS.from_texts(TEXTS, embeddings, metadatas=[{"source": f"kb/{i}.txt"} for i in range(len(TEXTS))])
+    save_index(db, str(tmp_path))
+    return db, str(tmp_path)
+
+
+def test_round_trip_keeps_ids_text_and_metadata(store, embeddings):
+    original, path = store
+    loaded = load_index(path, embeddings)
+
+    assert loaded.index.ntotal == len(TEXTS)
+    for pos in range(len(TEXTS)):
+        doc_id = original.index_to_docstore_id[pos]
+        assert loaded.index_to_docstore_id[pos] == doc_id
+        doc = loaded.docstore.search(doc_id)
+        assert doc.page_content == original.docstore.search(doc_id).page_content
+        assert doc.metadata == {"source": f"kb/{pos}.txt"}
+
+
+def test_loaded_index_answers_like_the_original(store, embeddings):
+    original, path = store
+    loaded = load_index(path, embeddings)
+    query = TEXTS[1]
+    assert [d.page_content for d in loaded.similarity_search(query, k=2)] == \
+        [d.page_content for d in original.similarity_search(query, k=2)]
+
+
+def test_update_round_trip(store, embeddings):
+    _, path = store
+    db = load_index_for_update(path, embeddings)
+    db.add_texts(["Migraine is a recurrent primary headache disorder."], metadatas=[{"source": "kb/3.txt"}])
+    save_index(db, path)
+
+    loaded = load_index(path, embeddings)
+    assert loaded.index.ntotal == len(TEXTS) + 1
+    assert loaded.similarity_search("Migraine is a recurrent primary headache disorder.", k=1)[0].metadata == \
+        {"source": "kb/3.txt"}
+
+
+def test_mismatched_docstore_is_refused(store, embeddings, tmp_path_factory):
+    _, path = store
+    other = str(tmp_path_factory.mktemp("other"))
+    save_index(FAISS.from_texts(TEXTS[:1], embeddings), other)
+    shutil.copy(os.path.join(other, DOCSTORE_FILE), os.path.join(path, DOCSTORE_FILE))
+
+    with pytest.raises(RuntimeError):
+        load_index(path, embeddings)
+
+
+def test_docstore_replaced_before_first_read_is_reported(store, embeddings):
+    original, path = store
+    chunks = _SQLiteChunks(os.path.join(path, DOCSTORE_FILE))
+    save_index(original, path)
+
+    with pytest.raises(StaleDocstoreError):
+        chunks.query_one("SELECT COUNT(*) FROM chunks")
@@ -0,0 +1,144 @@
+import time
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from backend.app import llm_gateway
+from backend.app.llm_gateway import CircuitBreaker, LLMGateway, LLMUnavailableError, TokenBucket
+
+
+class _ProviderError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class _FakeModel:
+    """Raises the queued errors in turn, then answers."""
+
+    def __init__(self, *errors, answer="ok"):
+        self.errors = list(errors)
+        self.answer = answer
+        self.calls = 0
+
+    def _next(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.answer
+
+    def invoke(self, input, config=None, **kwargs):
+        return self._next()
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        return self._next()
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def fast_gateway(monkeypatch):
+    # no request quota and no backoff sleeps; 3 consecutive failures open the breaker
+    monkeypatch.setattr(llm_gateway, "LLM_RPM", 0)
+    monkeypatch.setattr(llm_gateway, "LLM_BACKOFF_BASE", 0)
+    monkeypatch.setattr(llm_gateway, "LLM_MAX_RETRIES", 2)
+    monkeypatch.setattr(llm_gateway, "LLM_BREAKER_THRESHOLD", 3)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(llm_gateway, "time", SimpleNamespace(
+        monotonic=clock, perf_counter=time.perf_counter, sleep=time.sleep,
+    ))
+    return clock
+
+
+def test_retryable_errors_are_retried():
+    model = _FakeModel(_ProviderError(503), TimeoutError())
+    gateway = LLMGateway(model)
+    assert asyncio.run(gateway.ainvoke("hi")) == "ok"
+    assert model.calls == 3
+
+
+def test_client_errors_are_not_retried():
+    model = _FakeModel(_ProviderError(400))
+    gateway = LLMGateway(model)
+    with pytest.raises(_ProviderError):
+        gateway.invoke("hi")
+    assert model.calls == 1
+    assert gateway.stats()["breaker"] == "closed"
+
+
+def test_open_breaker_falls_back_to_the_secondary():
+    primary = _FakeModel(*[_ProviderError(503)] * 3)
+    secondary = _FakeModel(answer="from secondary")
+    gateway = LLMGateway(primary, secondary)
+
+    # the third failed attempt opens the breaker
+    with pytest.raises(_ProviderError):
+        asyncio.run(gateway.ainvoke("hi"))
+    assert gateway.stats()["breaker"] == "open"
+    assert asyncio.run(gateway.ainvoke("hi")) == "from secondary"
+    assert primary.calls == 3
+
+
+def test_open_breaker_without_secondary_sheds_calls():
+    gateway = LLMGateway(_FakeModel(*[_ProviderError(503)] * 3))
+    with pytest.raises(_ProviderError):
+        gateway.invoke("hi")
+    with pytest.raises(LLMUnavailableError):
+        gateway.invoke("hi")
+
+
+def test_half_open_breaker_admits_a_single_probe(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=30)
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    clock.now += 30
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_probe_reopens_the_breaker(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.now += 29
+    assert not breaker.allow()
+
+
+def test_token_bucket_refuses_a_wait_past_max_wait(clock):
+    bucket = TokenBucket(rate_per_sec=1.0, capacity=1)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve(max_wait=0.5) is None
+    # the refused reservation took nothing
+    assert bucket.reserve(max_wait=1.0) == pytest.approx(1.0)
+
+
+def test_exhausted_quota_is_shed_before_taking_a_slot(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "LLM_QUEUE_TIMEOUT", 0.1)
+    model = _FakeModel()
+    gateway = LLMGateway(model)
+    gateway._bucket = TokenBucket(rate_per_sec=1 / 60, capacity=1)
+
+    assert asyncio.run(gateway.ainvoke("hi")) == "ok"
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(gateway.ainvoke("hi"))
+    assert model.calls == 1
+    assert gateway._async_slots._value == llm_gateway.LLM_MAX_CONCURRENCY
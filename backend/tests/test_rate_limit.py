@@ -0,0 +1,107 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from backend.app import rate_limit
+from backend.app.rate_limit import MemoryStore, RateLimiter, parse_rate
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class _CountingStore(MemoryStore):
+    def __init__(self):
+        super().__init__()
+        self.costs = []
+
+    async def acquire(self, key, capacity, rate, cost=1):
+        self.costs.append(cost)
+        return await super().acquire(key, capacity, rate, cost)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    # only this module's clock; the event loop keeps the real one
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def hit(limiter, key="rl:chat:user:1", capacity=10, period=60.0):
+    return asyncio.run(limiter.hit(key, capacity, period))
+
+
+def test_parse_rate():
+    assert parse_rate("10/minute") == (10, 60.0)
+    assert parse_rate("5/hours") == (5, 3600.0)
+    with pytest.raises(ValueError):
+        parse_rate("5/fortnight")
+
+
+def test_memory_store_bucket_refills_evenly(clock):
+    store = MemoryStore()
+    for _ in range(3):
+        assert asyncio.run(store.acquire("k", 3, 1.0)) == (True, 0.0)
+    allowed, retry = asyncio.run(store.acquire("k", 3, 1.0))
+    assert not allowed and retry == pytest.approx(1.0)
+
+    clock.now += 1.0
+    assert asyncio.run(store.acquire("k", 3, 1.0))[0]
+
+
+def test_lease_is_spent_locally(clock):
+    store = _CountingStore()
+    limiter = RateLimiter(store, lease_fraction=0.5)
+
+    for _ in range(5):
+        assert hit(limiter) is None
+    # one lease of 5 tokens served all five hits
+    assert store.costs == [5]
+    assert limiter.local_hits == 4
+
+    assert hit(limiter) is None
+    assert store.costs == [5, 5]
+
+
+def test_lease_lapses_after_its_refill_time(clock):
+    store = _CountingStore()
+    limiter = RateLimiter(store, lease_fraction=0.5)
+    hit(limiter)
+
+    # 5 tokens at 10/minute refill in 30s
+    clock.now += 30.0
+    hit(limiter)
+    assert store.costs == [5, 5]
+
+
+def test_leases_never_exceed_the_shared_limit(clock):
+    store = MemoryStore()
+    workers = [RateLimiter(store, lease_fraction=0.5) for _ in range(3)]
+    allowed = sum(hit(worker) is None for worker in workers for _ in range(10))
+    assert allowed == 10
+
+
+def test_small_limits_skip_the_lease(clock):
+    store = _CountingStore()
+    limiter = RateLimiter(store, lease_fraction=0.2)
+    for _ in range(3):
+        hit(limiter, capacity=3)
+    assert store.costs == [1, 1, 1]
+    assert hit(limiter, capacity=3) == pytest.approx(20.0)
+
+
+def test_sweep_drops_expired_leases(clock):
+    limiter = RateLimiter(MemoryStore(), lease_fraction=0.5)
+    for n in range(100):
+        hit(limiter, key=f"rl:chat:ip:{n}")
+
+    clock.now += 60.0
+    limiter._hits = 9999
+    hit(limiter, key="rl:chat:ip:new")
+    assert list(limiter._leases) == ["rl:chat:ip:new"]
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from backend.app import chat_storage
+from backend.app.chat_storage import WriteBehindBuffer
+
+
+class _FakeCollection:
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.batches = []
+
+    async def bulk_write(self, ops, ordered=True):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("mongod unreachable")
+        self.batches.append(ops)
+
+
+@pytest.fixture
+def collections(monkeypatch):
+    messages, chats = _FakeCollection(), _FakeCollection()
+    monkeypatch.setattr(chat_storage, "async_messages", messages)
+    monkeypatch.setattr(chat_storage, "async_chats", chats)
+    return messages, chats
+
+
+def test_flush_inserts_messages_and_coalesces_chat_updates(collections):
+    messages, chats = collections
+    buffer = WriteBehindBuffer()
+    buffer.record_turn("chat-1", "what is anaemia", "Low haemoglobin ...", title="Anaemia")
+    buffer.record_turn("chat-1", "and its causes", "Iron deficiency ...")
+
+    asyncio.run(buffer.flush())
+
+    [inserts] = messages.batches
+    assert [op._doc["content"] for op in inserts] == [
+        "what is anaemia", "Low haemoglobin ...", "and its causes", "Iron deficiency ...",
+    ]
+    [updates] = chats.batches
+    assert len(updates) == 1
+    fields = updates[0]._doc["$set"]
+    assert fields["title"] == "Anaemia"
+    assert fields["preview"] == "Iron deficiency ..."
+    assert not buffer.has_pending()
+
+
+def test_failed_flush_requeues_with_the_same_ids(collections):
+    messages, _ = collections
+    messages.failures = 1
+    buffer = WriteBehindBuffer()
+    buffer.record_turn("chat-1", "question", "answer")
+    ids = [doc["_id"] for doc in buffer._messages]
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(buffer.flush())
+    assert buffer.has_pending("chat-1")
+
+    asyncio.run(buffer.flush())
+    assert [op._doc["_id"] for op in messages.batches[0]] == ids
+
+
+def test_requeued_update_does_not_overwrite_a_newer_one(collections):
+    _, chats = collections
+    chats.failures = 1
+    buffer = WriteBehindBuffer()
+    buffer.record_turn("chat-1", "first", "old answer")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(buffer.flush())
+    buffer.record_turn("chat-1", "second", "new answer")
+    asyncio.run(buffer.flush())
+
+    assert chats.batches[0][0]._doc["$set"]["preview"] == "new answer"
+
+
+def test_discard_drops_only_that_chat(collections):
+    messages, chats = collections
+    buffer = WriteBehindBuffer()
+    buffer.record_turn("deleted", "question", "answer")
+    buffer.record_turn("kept", "question", "answer")
+
+    asyncio.run(buffer.discard("deleted"))
+    asyncio.run(buffer.flush())
+
+    assert {op._doc["chat_id"] for op in messages.batches[0]} == {"kept"}
+    assert [op._filter["chat_id"] for op in chats.batches[0]] == ["kept"]